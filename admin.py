@@ -167,7 +167,7 @@ class InscriptionAdmin(admin.ModelAdmin,):
 @admin.register(Image)
 class ImageAdmin(admin.ModelAdmin,):
     fields              = ['image_preview', *get_fields(Image, exclude=['id'])]
-    readonly_fields     = ['iiif_file', 'uuid', 'image_preview', *DEFAULT_FIELDS]
+    readonly_fields     = ['iiif_file', 'uuid', 'image_preview', 'role', *DEFAULT_FIELDS]
     autocomplete_fields = ['panel', 'inscription']
     list_display = ['panel', 'inscription', 'type_of_image']
     search_fields = ['panel__title', 'type_of_image__text', 'iiif_file']
@@ -0,0 +1,120 @@
+"""W3C annotations of inscription positions, read by the image viewer."""
+from django.core.cache import cache
+from django.db.models import Count, Max
+from urllib.parse import urlencode
+import hashlib
+import json
+from . import models
+
+IIIF_IMAGE_URL = 'https://img.dh.gu.se/saintsophia/static/'
+# pages are also dropped when their data changes, see annotation_page_cache_key
+ANNOTATION_PAGE_CACHE_TIMEOUT = 60 * 60
+
+
+def annotation_inscriptions(surface=None):
+    """Inscriptions annotated on *surface* (a panel title), or all of them."""
+    inscriptions = models.Inscription.objects.all()
+    if surface:
+        inscriptions = inscriptions.filter(panel__title=surface)
+    return inscriptions
+
+
+def build_annotation(pk, panel_id, position_on_surface, source=None):
+    """Annotation of one inscription, its position as a media fragment of the surface."""
+    if position_on_surface is not None:
+        pct_to_percent_string = position_on_surface.replace("pct", "percent")
+    else:
+        pct_to_percent_string = ""
+    target = {
+        "selector": {
+            "type": "FragmentSelector",
+            "conformsTo": "http://www.w3.org/TR/media-frags/",
+            "value": f"xywh={pct_to_percent_string}"
+        }
+    }
+    if source is not None:
+        target = {"type": "SpecificResource", "source": source, **target}
+    return {
+        "type": "Annotation",
+        "body": [
+            {"value": f"Inscription {panel_id}:{pk}"}
+        ],
+        "target": target,
+        "id": pk
+    }
+
+
+def annotation_rows(inscriptions):
+    """(id, panel id, position) of each inscription, without loading model instances."""
+    return inscriptions.order_by('id').values_list('id', 'panel_id', 'position_on_surface')
+
+
+def orthophotos(inscriptions):
+    """Orthophotos of the surfaces of *inscriptions*."""
+    return models.Image.objects.filter(type_of_image=1, panel__in=inscriptions.values('panel_id')) # 1 is orthophotos
+
+
+def orthophoto_sources(inscriptions):
+    """Map panel ids of *inscriptions* to the IIIF image of their first orthophoto."""
+    images = (
+        orthophotos(inscriptions)
+        .order_by('panel_id', 'pk')
+        .distinct('panel_id')
+        .values_list('panel_id', 'iiif_file')
+    )
+    return {panel_id: f"{IIIF_IMAGE_URL}{iiif_file}" for panel_id, iiif_file in images}
+
+
+def annotation_page_id(request, panel=None):
+    """IRI of the AnnotationPage of *panel* (or of all surfaces), whatever other
+    parameters the request has."""
+    page_id = request.build_absolute_uri(request.path)
+    if panel is not None:
+        page_id = f"{page_id}?{urlencode({'surface': panel.title})}"
+    return page_id
+
+
+def annotation_page_cache_key(page_id, panel, inscriptions):
+    """Cache key of the AnnotationPage of *panel* (None for all surfaces).
+
+    It changes whenever an inscription or an orthophoto of the page is saved,
+    added or deleted. *page_id* comes from annotation_page_id(), so a key
+    exists only per surface and host.
+    """
+    versions = [
+        queryset.aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        for queryset in (inscriptions, orthophotos(inscriptions))
+    ]
+    version = ':'.join(f"{state['count']}:{state['last_modified']}" for state in versions)
+    digest = hashlib.md5(page_id.encode('utf-8')).hexdigest()
+    surface = panel.pk if panel is not None else 'all'
+    return f"inscriptions:annotation-page:{surface}:{digest}:{version}"
+
+
+def annotation_page_chunks(page_id, inscriptions, cache_key=None):
+    """Yield an AnnotationPage as JSON text, one annotation at a time.
+
+    When *cache_key* is given, the complete page is stored under it once the
+    last chunk has been produced.
+    """
+    sources = orthophoto_sources(inscriptions)
+    chunks = []
+
+    def emit(chunk):
+        if cache_key is not None:
+            chunks.append(chunk)
+        return chunk
+
+    yield emit('{"@context": "http://www.w3.org/ns/anno.jsonld", '
+               f'"id": {json.dumps(page_id)}, "type": "AnnotationPage", "items": [')
+    separator = ''
+    for pk, panel_id, position_on_surface in annotation_rows(inscriptions).iterator():
+        annotation = build_annotation(pk, panel_id, position_on_surface, sources.get(panel_id))
+        # annotation ids must be IRIs in a page
+        annotation["id"] = f"{page_id}#{pk}"
+        yield emit(separator + json.dumps(annotation))
+        separator = ', '
+    yield emit(']}')
+
+    if cache_key is not None:
+        cache.set(cache_key, ''.join(chunks), timeout=ANNOTATION_PAGE_CACHE_TIMEOUT)
@@ -0,0 +1,140 @@
+"""Background fetching of image dimensions from the IIIF server.
+
+Image ids are queued once the transaction that created them is committed and
+handled by a worker thread, in batches: the info.json documents of a batch are
+fetched through one pooled HTTP session, which retries failed requests with
+exponential backoff, and the dimensions are written with a single UPDATE that
+sends no signals. Saving an image therefore never waits for the IIIF server.
+Ids still queued when the process exits are picked up by the
+fetch_image_dimensions command, which handles every image without dimensions.
+"""
+import logging
+import queue
+import threading
+from django.conf import settings
+from django.db import close_old_connections
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import requests
+from . import models
+
+logger = logging.getLogger(__name__)
+
+
+def iiif_session(retries=3, backoff_factor=0.5, pool_size=4):
+    """HTTP session with pooled connections, retrying failed requests with backoff."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET',),
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class DimensionFetcher:
+    """Reads the width and height of images from the info.json of their IIIF file.
+
+    *base_url* defaults to settings.IIIF_URL; point it at a local server to
+    fetch from somewhere else.
+    """
+
+    def __init__(self, base_url=None, timeout=10, session=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = session or iiif_session()
+
+    def info_url(self, iiif_file):
+        base_url = self.base_url if self.base_url is not None else settings.IIIF_URL
+        return f"{base_url}{iiif_file}/info.json"
+
+    def fetch(self, pk, iiif_file):
+        """(width, height) of one image, or None if they could not be read."""
+        url = self.info_url(iiif_file)
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            info = response.json()
+        except (requests.RequestException, ValueError) as exc:
+            logger.warning("Could not fetch info.json of image %s from %s: %s", pk, url, exc)
+            return None
+        width, height = info.get('width'), info.get('height')
+        if not (width and height):
+            logger.warning("No width or height in info.json of image %s (%s)", pk, url)
+            return None
+        return width, height
+
+    def update(self, pks):
+        """Fetch and store the dimensions of the images *pks*; returns how many were stored."""
+        images = models.Image.objects.filter(pk__in=pks).exclude(iiif_file='').values_list('pk', 'iiif_file')
+        fetched = []
+        for pk, iiif_file in images:
+            dimensions = self.fetch(pk, iiif_file)
+            if dimensions is not None:
+                fetched.append(models.Image(pk=pk, width=dimensions[0], height=dimensions[1]))
+        # bulk_update writes the columns directly, without save() or post_save
+        models.Image.objects.bulk_update(fetched, ['width', 'height'])
+        logger.info("Stored dimensions of %d of %d images", len(fetched), len(pks))
+        return len(fetched)
+
+
+class DimensionQueue:
+    """Queue of image ids whose dimensions a daemon thread fetches in batches.
+
+    The thread starts with the first enqueue(). join() waits until every queued
+    id has been handled.
+    """
+
+    def __init__(self, fetcher=None, batch_size=20, batch_wait=1.0):
+        self.fetcher = fetcher
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def enqueue(self, pks):
+        for pk in pks:
+            self.queue.put(pk)
+        self.start()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='iiif-dimensions', daemon=True)
+                self.thread.start()
+
+    def join(self):
+        self.queue.join()
+
+    def next_batch(self):
+        """Block for one id, then gather those queued within batch_wait, up to batch_size."""
+        batch = [self.queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get(timeout=self.batch_wait))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        if self.fetcher is None:
+            self.fetcher = DimensionFetcher()
+        while True:
+            batch = self.next_batch()
+            try:
+                self.fetcher.update(sorted(set(batch)))
+            except Exception:
+                logger.exception("Fetching dimensions of images %s failed", batch)
+            finally:
+                # the thread outlives requests; do not keep their connections open
+                close_old_connections()
+                for _ in batch:
+                    self.queue.task_done()
+
+
+dimension_queue = DimensionQueue()
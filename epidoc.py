@@ -0,0 +1,201 @@
+"""EpiDoc TEI documents of inscriptions, written incrementally with lxml.
+
+Each inscription becomes a TEI document: a header built from its metadata
+(surface, language, dating, bibliography) and a body holding its stored
+EpiDoc edition and interpretation. Documents are written one at a time with
+etree.xmlfile, either into one teiCorpus or as the entries of a zip archive,
+so memory does not depend on the size of the corpus.
+"""
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.exceptions import ValidationError
+from django.db.models import OuterRef, Q
+from lxml import etree
+import zipfile
+from .exports import label_expression, through_rows
+from . import models
+
+TEI_NS = 'http://www.tei-c.org/ns/1.0'
+XML_NS = 'http://www.w3.org/XML/1998/namespace'
+PROJECT_TITLE = 'Graffiti of Saint Sophia of Kyiv'
+
+# stored EpiDoc field -> subtype of the edition div it is written to
+EPIDOC_FIELDS = {
+    'epidoc_text': 'transcription',
+    'epidoc_interpretation': 'interpretation',
+}
+
+
+def tei(tag):
+    return f'{{{TEI_NS}}}{tag}'
+
+
+def parse_epidoc(value):
+    """The root element of a stored EpiDoc document, or None if empty or not well-formed."""
+    if not value:
+        return None
+    try:
+        return models.parse_epidoc_xml(value)
+    except ValidationError:
+        return None
+
+
+def epidoc_inscriptions(inscriptions=None):
+    """Inscriptions that have EpiDoc content."""
+    if inscriptions is None:
+        inscriptions = models.Inscription.objects.all()
+    has_epidoc = Q()
+    for field in EPIDOC_FIELDS:
+        has_epidoc |= Q(**{f'{field}__isnull': False}) & ~Q(**{field: ''})
+    return inscriptions.filter(has_epidoc)
+
+
+def tei_records(inscriptions, chunk_size=500):
+    """Yield the values needed for the TEI document of each inscription."""
+    rows, target = through_rows('bibliography')
+    bibliography = ArraySubquery(
+        rows.filter(inscription_id=OuterRef('pk'))
+        .order_by(target)
+        .values_list(label_expression(models.BibliographyItem, 'bibliographyitem__'), flat=True)
+    )
+    return (
+        inscriptions
+        .order_by('pk')
+        .values(
+            'id', 'title', 'denomination', 'panel__title', 'panel__room',
+            'language__text', 'min_year', 'max_year', 'updated_at', *EPIDOC_FIELDS,
+            bibliography=bibliography,
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def document_name(record):
+    return f"inscription-{record['id']}"
+
+
+def _text_element(xf, tag, text, **attributes):
+    with xf.element(tei(tag), **attributes):
+        xf.write(text)
+
+
+def write_tei_header(xf, record):
+    """Write the teiHeader of an inscription from its metadata."""
+    title = f"Inscription {record['denomination'] or record['id']}"
+    if record['title']:
+        title = f"{title} ({record['title']})"
+
+    with xf.element(tei('teiHeader')):
+        with xf.element(tei('fileDesc')):
+            with xf.element(tei('titleStmt')):
+                _text_element(xf, 'title', title)
+            with xf.element(tei('publicationStmt')):
+                _text_element(xf, 'authority', PROJECT_TITLE)
+                _text_element(xf, 'idno', str(record['id']), type='filename')
+            with xf.element(tei('sourceDesc')):
+                with xf.element(tei('msDesc')):
+                    with xf.element(tei('msIdentifier')):
+                        _text_element(xf, 'repository', 'Saint Sophia Cathedral, Kyiv')
+                        if record['panel__room']:
+                            _text_element(xf, 'collection', record['panel__room'])
+                        if record['panel__title']:
+                            _text_element(xf, 'idno', record['panel__title'], type='surface')
+                    dating = {}
+                    if record['min_year'] is not None:
+                        dating['notBefore'] = f"{record['min_year']:04d}"
+                    if record['max_year'] is not None:
+                        dating['notAfter'] = f"{record['max_year']:04d}"
+                    if dating:
+                        with xf.element(tei('history')):
+                            with xf.element(tei('origin')):
+                                with xf.element(tei('origDate'), **dating):
+                                    pass
+                if record['bibliography']:
+                    with xf.element(tei('listBibl')):
+                        for item in record['bibliography']:
+                            _text_element(xf, 'bibl', item)
+        if record['language__text']:
+            with xf.element(tei('profileDesc')):
+                with xf.element(tei('langUsage')):
+                    _text_element(xf, 'language', record['language__text'])
+        with xf.element(tei('revisionDesc')):
+            with xf.element(tei('change'), when=record['updated_at'].date().isoformat()):
+                xf.write('Exported from the project database')
+
+
+def _edition_content(root):
+    """Elements of a stored EpiDoc document to place inside an edition div."""
+    if etree.QName(root).localname == 'TEI':
+        # a complete document: keep what is in its body
+        body = root.find(f'.//{tei("body")}')
+        return list(body) if body is not None else []
+    return [root]
+
+
+def write_tei_document(xf, record, nsmap=None):
+    """Write the TEI element of an inscription (*nsmap* when it is the root element)."""
+    # the xml prefix is declared explicitly, xmlfile does not know it is predefined
+    with xf.element(tei('TEI'), {f'{{{XML_NS}}}id': document_name(record)}, nsmap={**(nsmap or {}), 'xml': XML_NS}):
+        write_tei_header(xf, record)
+        with xf.element(tei('text')):
+            with xf.element(tei('body')):
+                for field, subtype in EPIDOC_FIELDS.items():
+                    root = parse_epidoc(record[field])
+                    if root is None:
+                        continue
+                    with xf.element(tei('div'), type='edition', subtype=subtype):
+                        for element in _edition_content(root):
+                            xf.write(element)
+
+
+class _Chunks:
+    """Write-only file collecting what is written to it until drained."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_tei_corpus(records):
+    """Yield a teiCorpus of the documents of *records*, as bytes, one document at a time."""
+    out = _Chunks()
+    with etree.xmlfile(out, encoding='utf-8') as xf:
+        xf.write_declaration()
+        with xf.element(tei('teiCorpus'), nsmap={None: TEI_NS}):
+            with xf.element(tei('teiHeader')):
+                with xf.element(tei('fileDesc')):
+                    with xf.element(tei('titleStmt')):
+                        _text_element(xf, 'title', PROJECT_TITLE)
+                    with xf.element(tei('publicationStmt')):
+                        _text_element(xf, 'authority', PROJECT_TITLE)
+                    with xf.element(tei('sourceDesc')):
+                        _text_element(xf, 'p', 'Born-digital EpiDoc editions')
+            yield out.drain()
+            for record in records:
+                write_tei_document(xf, record)
+                xf.flush()
+                yield out.drain()
+    yield out.drain()
+
+
+def iter_tei_zip(records):
+    """Yield a zip archive with one TEI document per record, as bytes, one entry at a time."""
+    out = _Chunks()
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for record in records:
+            with archive.open(f'{document_name(record)}.xml', 'w') as entry:
+                with etree.xmlfile(entry, encoding='utf-8') as xf:
+                    xf.write_declaration()
+                    write_tei_document(xf, record, nsmap={None: TEI_NS})
+            yield out.drain()
+    yield out.drain()
@@ -0,0 +1,112 @@
+"""Bulk reads of the inscription corpus for exports and streaming endpoints.
+
+Rows are read with values() and a server-side cursor, and many-to-many
+relations are aggregated in SQL, so memory does not grow with the corpus.
+"""
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Case, F, OuterRef, Q, Subquery, TextField, Value, When
+from django.db.models.functions import Cast, Concat
+import json
+from . import models
+from .richtext import cleaned_rich_text_value
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# many-to-many fields of Inscription, in export column order
+INSCRIPTION_M2M_FIELDS = [
+    'genre', 'tags', 'dating_criteria', 'mentioned_person', 'condition',
+    'alignment', 'extra_alphabetical_sign', 'bibliography', 'author',
+]
+
+# RichText fields exported with <p> and <br /> kept, as in InscriptionSerializer
+PRESERVE_TAGS_FIELDS = ['transcription', 'interpretative_edition', 'translation_eng', 'translation_ukr']
+
+
+def through_rows(field_name, model=models.Inscription):
+    """Rows of the through table of a many-to-many field of *model* and the
+    name of its column pointing at the related model."""
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    target = field.m2m_reverse_field_name()
+    return through.objects, f'{target}_id'
+
+
+def m2m_ids(field_name):
+    """Array of the related ids of an Inscription many-to-many field, per inscription."""
+    rows, target = through_rows(field_name)
+    return ArraySubquery(rows.filter(inscription_id=OuterRef('pk')).order_by(target).values(target))
+
+
+def label_expression(model, prefix=''):
+    """SQL expression of str() of a *model* instance reached through the lookup *prefix*."""
+    if model is models.Author:
+        return Concat(F(f'{prefix}firstname'), Value(' '), F(f'{prefix}lastname'), output_field=TextField())
+    if model is models.BibliographyItem:
+        return Concat(
+            F(f'{prefix}authors'), Value(' ('), Cast(f'{prefix}year', TextField()), Value(')'),
+            output_field=TextField(),
+        )
+    if model is models.HistoricalPerson:
+        name, name_ukr = f'{prefix}name', f'{prefix}name_ukr'
+        return Case(
+            When(Q(**{f'{name}__isnull': False, f'{name_ukr}__isnull': True}), then=F(name)),
+            When(Q(**{f'{name}__isnull': True, f'{name_ukr}__isnull': False}), then=F(name_ukr)),
+            When(Q(**{f'{name}__isnull': False, f'{name_ukr}__isnull': False}),
+                 then=Concat(F(name), Value(' / '), F(name_ukr), output_field=TextField())),
+            default=Value('N/A'),
+            output_field=TextField(),
+        )
+    # vocabularies (AbstractTagModel and Language) are shown by their text
+    return Cast(f'{prefix}text', TextField())
+
+
+def m2m_labels(field_name, separator='; '):
+    """The str() of the related objects of an Inscription many-to-many field, joined by *separator*."""
+    rows, target = through_rows(field_name)
+    related_model = models.Inscription._meta.get_field(field_name).related_model
+    return Subquery(
+        rows.filter(inscription_id=OuterRef('pk'))
+        .values('inscription_id')
+        .annotate(labels=StringAgg(label_expression(related_model, f'{target[:-3]}__'), separator, ordering=target))
+        .values('labels'),
+        output_field=TextField(),
+    )
+
+
+def inscription_export_fields():
+    """Stored Inscription columns exported as they are (derived columns excluded)."""
+    return [
+        field.name for field in models.Inscription._meta.concrete_fields
+        if field.name not in models.Inscription.DERIVED_FIELDS
+    ]
+
+
+def inscription_records(inscriptions, chunk_size=2000):
+    """Yield one dict per inscription, with cleaned RichText and ``<field>_ids`` lists."""
+    fields = inscription_export_fields()
+    rows = (
+        inscriptions
+        .order_by('pk')
+        .values(*fields, 'rich_text_cache', **{f'{name}_ids': m2m_ids(name) for name in INSCRIPTION_M2M_FIELDS})
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        rich_text_cache = row.pop('rich_text_cache')
+        for field in models.Inscription.RICH_TEXT_FIELDS:
+            if row[field]:
+                row[field] = cleaned_rich_text_value(
+                    rich_text_cache, field, row[field],
+                    preserve_tags=field in PRESERVE_TAGS_FIELDS,
+                )
+        yield row
+
+
+def json_line(record):
+    """One NDJSON line (bytes) for a record, encoded with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(record, default=str, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode('utf-8')
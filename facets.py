@@ -0,0 +1,209 @@
+"""Counting support for the data widgets: a cached inscription total and an
+in-process bitmap index of inscriptions per filter value."""
+import threading
+import uuid
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from . import models
+
+
+# widget query parameter -> lookup on Inscription giving the ids of its values
+FACET_DIMENSIONS = {
+    'type_of_inscription': 'type_of_inscription',
+    'writing_system': 'writing_system',
+    'genre': 'genre',
+    'tags': 'tags',
+    'language': 'language',
+    'panel': 'panel',
+    'medium': 'panel__medium',
+    'material': 'panel__material',
+    'alignment': 'alignment',
+    'condition': 'condition',
+    'mentioned_person': 'mentioned_person',
+}
+
+# shared between processes so that each one notices when another changed the data
+VERSION_CACHE_KEY = 'inscriptions:facet-index-version'
+COUNT_CACHE_KEY = 'inscriptions:count'
+# the count is invalidated on change, but only in the caches this process sees
+COUNT_CACHE_TIMEOUT = 300
+
+
+# cache backends that are not shared between processes
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache():
+    """Whether the default cache is seen by every process of the site."""
+    return settings.CACHES.get('default', {}).get('BACKEND') not in PROCESS_LOCAL_CACHES
+
+
+def facet_index_enabled():
+    """Whether the data widgets count through the in-process facet index.
+
+    Processes learn of each other's updates through the cache, so unless
+    INSCRIPTIONS_FACET_INDEX is set the index is only used with a shared cache.
+    """
+    return getattr(settings, 'INSCRIPTIONS_FACET_INDEX', shared_cache())
+
+
+@checks.register(checks.Tags.caches)
+def check_facet_index_cache(app_configs, **kwargs):
+    if getattr(settings, 'INSCRIPTIONS_FACET_INDEX', False) and not shared_cache():
+        return [checks.Error(
+            'INSCRIPTIONS_FACET_INDEX needs a cache shared between processes.',
+            hint='Configure a shared default cache (e.g. Redis or Memcached), '
+                 'otherwise other processes keep counting from outdated data.',
+            id='inscriptions.E001',
+        )]
+    return []
+
+
+def inscription_count():
+    """Total number of inscriptions, cached until one is created or deleted, or
+    for at most COUNT_CACHE_TIMEOUT seconds."""
+    return cache.get_or_set(COUNT_CACHE_KEY, models.Inscription.objects.count, timeout=COUNT_CACHE_TIMEOUT)
+
+
+def invalidate_inscription_count():
+    cache.delete(COUNT_CACHE_KEY)
+
+
+def bitmap_from_ids(ids):
+    """Return the bitmap (an int with bit *id* set) of a collection of ids."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for pk in ids:
+        buffer[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def bitmap_count(bitmap):
+    """Number of ids in a bitmap."""
+    return bin(bitmap).count('1')
+
+
+class FacetIndex:
+    """Bitmaps of inscription ids for every value of the widget filter dimensions.
+
+    A bitmap is a Python integer whose bit *n* is set when inscription *n* has
+    the value, so combining filters is ``&`` and counting is a popcount. The
+    index is built on first use and updated incrementally from model signals.
+    ``version`` changes on every update; it is published in the cache so that
+    other processes rebuild their own copy when they see a different version.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self.version = None
+        self.all = 0
+        self.bitmaps = {dimension: {} for dimension in FACET_DIMENSIONS}
+
+    def _rows(self, lookup, pks=None):
+        inscriptions = models.Inscription.objects.all()
+        if pks is not None:
+            inscriptions = inscriptions.filter(pk__in=pks)
+        return inscriptions.filter(**{f'{lookup}__isnull': False}).values_list('pk', lookup).iterator()
+
+    def _bitmaps_for(self, pks=None):
+        bitmaps = {}
+        for dimension, lookup in FACET_DIMENSIONS.items():
+            ids_by_value = {}
+            for pk, value in self._rows(lookup, pks):
+                ids_by_value.setdefault(value, []).append(pk)
+            bitmaps[dimension] = {value: bitmap_from_ids(ids) for value, ids in ids_by_value.items()}
+        return bitmaps
+
+    def rebuild(self):
+        """Load the whole index from the database."""
+        with self._lock:
+            version = cache.get(VERSION_CACHE_KEY)
+            if version is None:
+                version = uuid.uuid4().hex
+                cache.add(VERSION_CACHE_KEY, version, timeout=None)
+                version = cache.get(VERSION_CACHE_KEY, version)
+            self.all = bitmap_from_ids(models.Inscription.objects.values_list('pk', flat=True).iterator())
+            self.bitmaps = self._bitmaps_for()
+            self.version = version
+            self._built = True
+
+    def _publish(self):
+        self.version = uuid.uuid4().hex
+        cache.set(VERSION_CACHE_KEY, self.version, timeout=None)
+
+    def ensure_current(self):
+        """Rebuild the index if it was never built or another process changed the data."""
+        with self._lock:
+            if not self._built or cache.get(VERSION_CACHE_KEY) != self.version:
+                self.rebuild()
+
+    def invalidate(self):
+        """Drop the index everywhere; it is rebuilt on next use."""
+        with self._lock:
+            self._built = False
+            self._publish()
+
+    def update(self, pks):
+        """Re-index the given inscriptions, dropping those that no longer exist."""
+        pks = set(pks)
+        if not pks:
+            return
+        with self._lock:
+            if not self._built or cache.get(VERSION_CACHE_KEY) != self.version:
+                # patching an index another process has moved on from would lose its
+                # change for good, once our version is published; rebuild on next use
+                self._built = False
+                self._publish()
+                return
+            mask = ~bitmap_from_ids(pks)
+            existing = set(models.Inscription.objects.filter(pk__in=pks).values_list('pk', flat=True))
+            self.all = (self.all & mask) | bitmap_from_ids(existing)
+            updated = self._bitmaps_for(existing)
+            for dimension, values in self.bitmaps.items():
+                for value in set(values) | set(updated[dimension]):
+                    values[value] = (values.get(value, 0) & mask) | updated[dimension].get(value, 0)
+            self._publish()
+
+    def filter(self, params):
+        """Bitmap of the inscriptions matching the widget filter *params*.
+
+        Only the indexed dimensions and ``id`` are applied; a value that is not
+        an integer id matches nothing.
+        """
+        with self._lock:
+            self.ensure_current()
+            bitmap = self.all
+            for dimension in ('id', *FACET_DIMENSIONS):
+                value = params.get(dimension)
+                if not value:
+                    continue
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    return 0
+                if dimension == 'id':
+                    # test the bit rather than build 1 << value, which can be arbitrarily large
+                    bitmap = 1 << value if value >= 0 and (bitmap >> value) & 1 else 0
+                else:
+                    bitmap &= self.bitmaps[dimension].get(value, 0)
+            return bitmap
+
+    def count(self, bitmap=None, **values):
+        """Count the inscriptions of *bitmap* (all by default) having the given dimension values."""
+        with self._lock:
+            self.ensure_current()
+            if bitmap is None:
+                bitmap = self.all
+            for dimension, value in values.items():
+                bitmap &= self.bitmaps[dimension].get(value, 0)
+            return bitmap_count(bitmap)
+
+
+facet_index = FacetIndex()
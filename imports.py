@@ -0,0 +1,161 @@
+"""Validation and bulk loading of inscription records (CSV or JSON rows).
+
+Rows are validated as on save, field by field with the model fields' own
+clean() and then with Inscription.clean(), without touching the database, so
+that validation can run in worker processes. References to other rows (foreign keys and many-to-many
+ids) are checked afterwards with one query per relation and batch.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from . import models
+from .facets import facet_index, invalidate_inscription_count
+
+# columns set by the database or computed on save
+NOT_IMPORTED = {'id', 'created_at', 'updated_at'}
+
+
+def importable_fields():
+    """Editable, stored Inscription fields read from a row (foreign keys included)."""
+    return [
+        field for field in models.Inscription._meta.concrete_fields
+        if field.editable and field.name not in NOT_IMPORTED and field.name not in models.Inscription.DERIVED_FIELDS
+    ]
+
+
+def m2m_fields():
+    return list(models.Inscription._meta.many_to_many)
+
+
+def _error_messages(error):
+    return error.messages if isinstance(error, ValidationError) else [str(error)]
+
+
+def _split_ids(value):
+    """Ids of a many-to-many cell: a list, or a string separated by ';' or ','."""
+    if value is None or value == '':
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [part.strip() for part in str(value).replace(',', ';').split(';') if part.strip()]
+
+
+def clean_row(row):
+    """Validate one record.
+
+    Returns ``(values, m2m, errors)``: model field values by attname, related
+    ids by many-to-many field name, and ``(field, message)`` pairs. Fields are
+    checked with Field.clean() and the row with Inscription.clean(), like a
+    save; references are checked by check_references().
+    """
+    values, m2m, errors = {}, {}, []
+
+    for field in importable_fields():
+        key = field.name if field.name in row else field.attname
+        if key not in row:
+            continue
+        raw = None if row[key] == '' else row[key]
+        try:
+            if field.is_relation:
+                # existence is checked by check_references(), not per row
+                value = None if raw is None else field.target_field.to_python(raw)
+                if value is None and not field.null:
+                    raise ValidationError('This field cannot be empty.')
+            else:
+                # conversion, validators, choices, null and blank, as on save
+                value = field.clean(raw, None)
+            values[field.attname] = value
+        except (ValidationError, TypeError, ValueError) as error:
+            errors.extend((field.name, message) for message in _error_messages(error))
+
+    if not errors:
+        # model-level checks (position on the surface), which need no database
+        try:
+            models.Inscription(**values).clean()
+        except ValidationError as error:
+            errors.extend(
+                (field, message)
+                for field, messages in error.update_error_dict({}).items()
+                for message in messages
+            )
+
+    for field in m2m_fields():
+        key = field.name if field.name in row else f'{field.name}_ids'
+        if key not in row:
+            continue
+        try:
+            m2m[field.name] = sorted({int(pk) for pk in _split_ids(row[key])})
+        except (TypeError, ValueError):
+            errors.append((field.name, f'Expected a list of ids, got {row[key]!r}'))
+
+    return values, m2m, errors
+
+
+def check_references(results):
+    """Add an error to every result that refers to a row that does not exist.
+
+    *results* is a list of ``[values, m2m, errors]`` lists; one query is made
+    per relation for the whole list.
+    """
+    relations = [
+        (field.name, field.related_model, lambda values, m2m, attname=field.attname: [values.get(attname)])
+        for field in importable_fields() if field.is_relation
+    ] + [
+        (field.name, field.related_model, lambda values, m2m, name=field.name: m2m.get(name, []))
+        for field in m2m_fields()
+    ]
+    for name, related_model, referenced in relations:
+        wanted = {pk for values, m2m, errors in results for pk in referenced(values, m2m) if pk is not None}
+        if not wanted:
+            continue
+        existing = set(related_model.objects.filter(pk__in=wanted).values_list('pk', flat=True))
+        for values, m2m, errors in results:
+            missing = [pk for pk in referenced(values, m2m) if pk is not None and pk not in existing]
+            if missing:
+                errors.append((name, f"No {related_model._meta.verbose_name} with id {', '.join(map(str, missing))}"))
+
+
+def create_inscriptions(valid):
+    """Insert (values, m2m) pairs with one INSERT per table, in one transaction.
+
+    The derived columns are computed before inserting, since bulk_create does
+    not call save(); search vectors, denominations, suggestions, EpiDoc tokens
+    and the facet index are refreshed afterwards. Returns the created inscriptions.
+    """
+    inscriptions = []
+    for values, m2m in valid:
+        inscription = models.Inscription(**values)
+        inscription.update_presave_fields()
+        inscriptions.append(inscription)
+
+    with transaction.atomic():
+        models.Inscription.objects.bulk_create(inscriptions)
+
+        for field in m2m_fields():
+            through = field.remote_field.through
+            source, target = f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+            through.objects.bulk_create([
+                through(**{source: inscription.pk, target: pk})
+                for inscription, (values, m2m) in zip(inscriptions, valid)
+                for pk in m2m.get(field.name, [])
+            ])
+
+        pks = [inscription.pk for inscription in inscriptions]
+        models.Inscription.objects.filter(pk__in=pks).update(
+            search_vector=models.Inscription.search_vector_expression(),
+            denomination=models.Inscription.denomination_expression(),
+        )
+        created = (
+            models.Inscription.objects.filter(pk__in=pks)
+            .select_related('panel')
+            .prefetch_related('mentioned_person', 'korniienko_image')
+        )
+        for inscription in created:
+            inscription.update_suggestions()
+        models.EpiDocToken.objects.bulk_create(
+            token for inscription in inscriptions for token in inscription.get_epidoc_tokens()
+        )
+
+        transaction.on_commit(lambda: facet_index.update(pks))
+        transaction.on_commit(invalidate_inscription_count)
+
+    return inscriptions
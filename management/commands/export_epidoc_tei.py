@@ -0,0 +1,69 @@
+import os
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from apps.inscriptions.epidoc import epidoc_inscriptions, iter_tei_corpus, iter_tei_zip, tei_records
+from apps.inscriptions.models import Inscription
+
+
+class Command(BaseCommand):
+    help = ('Export the EpiDoc editions of inscriptions with TEI headers built from their metadata, '
+            'as one teiCorpus file or a zip of per-inscription TEI documents')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help='Output file path (default: inscriptions_epidoc_TIMESTAMP.xml, or .zip with --zip)'
+        )
+        parser.add_argument(
+            '--zip',
+            action='store_true',
+            help='Write a zip archive with one TEI document per inscription instead of a teiCorpus'
+        )
+        parser.add_argument(
+            '--panel',
+            type=str,
+            default=None,
+            help='Only export inscriptions on the surface with this title'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of inscriptions fetched from the database at a time (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        if options['output']:
+            output_file = options['output']
+        else:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            output_file = f"inscriptions_epidoc_{timestamp}.{'zip' if options['zip'] else 'xml'}"
+
+        inscriptions = epidoc_inscriptions(Inscription.objects.all())
+        if options['panel']:
+            inscriptions = inscriptions.filter(panel__title=options['panel'])
+
+        exported = 0
+
+        def counted(records):
+            nonlocal exported
+            for record in records:
+                exported += 1
+                yield record
+
+        records = counted(tei_records(inscriptions, chunk_size=options['chunk_size']))
+        chunks = iter_tei_zip(records) if options['zip'] else iter_tei_corpus(records)
+
+        started = time.monotonic()
+        with open(output_file, 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Exported {exported} EpiDoc documents to {output_file} in {elapsed:.1f}s')
+        )
+        self.stdout.write(f'File size: {os.path.getsize(output_file):,} bytes')
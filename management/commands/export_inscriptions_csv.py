@@ -1,9 +1,50 @@
 import csv
+import gzip
 import os
+import time
 from datetime import datetime
-from django.core.management.base import BaseCommand
-from django.db.models import Q
-from apps.inscriptions.models import Inscription
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Case, Q, TextField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from apps.inscriptions.exports import INSCRIPTION_M2M_FIELDS, label_expression, m2m_labels
+from apps.inscriptions.models import HistoricalPerson, Inscription
+
+# CSV header -> value read from the database for it
+COLUMNS = [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('position_on_surface', 'position_on_surface'),
+    ('panel_title', 'panel__title'),
+    ('panel_room', 'panel__room'),
+    ('type_of_inscription', 'type_of_inscription__text'),
+    ('genres', 'genre_labels'),
+    ('tags', 'tags_labels'),
+    ('elevation', 'elevation'),
+    ('height', 'height'),
+    ('width', 'width'),
+    ('language', 'language__text'),
+    ('writing_system', 'writing_system__text'),
+    ('min_year', 'min_year'),
+    ('max_year', 'max_year'),
+    ('dating_criteria', 'dating_criteria_labels'),
+    ('transcription', 'transcription'),
+    ('interpretative_edition', 'interpretative_edition'),
+    ('romanisation', 'romanisation'),
+    ('mentioned_persons', 'mentioned_person_labels'),
+    ('inscriber', 'inscriber_label'),
+    ('translation_eng', 'translation_eng'),
+    ('translation_ukr', 'translation_ukr'),
+    ('comments_eng', 'comments_eng'),
+    ('comments_ukr', 'comments_ukr'),
+    ('conditions', 'condition_labels'),
+    ('alignments', 'alignment_labels'),
+    ('extra_alphabetical_signs', 'extra_alphabetical_sign_labels'),
+    ('bibliography_items', 'bibliography_labels'),
+    ('authors', 'author_labels'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
 
 
 class Command(BaseCommand):
@@ -16,6 +57,29 @@ class Command(BaseCommand):
             default=None,
             help='Output file path (default: inscriptions_with_transcription_TIMESTAMP.csv)'
         )
+        parser.add_argument(
+            '--since',
+            type=str,
+            default=None,
+            help='Only export inscriptions updated at or after this date or datetime (ISO 8601)'
+        )
+        parser.add_argument(
+            '--panel',
+            type=str,
+            default=None,
+            help='Only export inscriptions on the surface with this title'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Compress the output with gzip (adds .gz to the default file name)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Number of rows fetched from the database at a time (default: 2000)'
+        )
 
     def handle(self, *args, **options):
         # Generate default filename with timestamp if not provided
@@ -24,92 +88,62 @@ class Command(BaseCommand):
         else:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             output_file = f'inscriptions_with_transcription_{timestamp}.csv'
+            if options['gzip']:
+                output_file += '.gz'
 
         # Build query to filter inscriptions with non-empty transcription field only
         query = Q(transcription__isnull=False) & ~Q(transcription__exact='')
+        if options['since']:
+            query &= Q(updated_at__gte=self.parse_since(options['since']))
+        if options['panel']:
+            query &= Q(panel__title=options['panel'])
 
-        # Get inscriptions matching the criteria
-        inscriptions = Inscription.objects.filter(query).distinct().prefetch_related(
-            'panel', 'type_of_inscription', 'genre', 'tags', 'language', 
-            'writing_system', 'dating_criteria', 'mentioned_person', 'inscriber',
-            'condition', 'alignment', 'extra_alphabetical_sign', 'bibliography', 'author'
+        # one row per inscription: foreign keys are joined, many-to-many relations
+        # are aggregated into '; '-separated strings in SQL
+        inscriptions = (
+            Inscription.objects.filter(query)
+            .annotate(
+                inscriber_label=Case(
+                    When(inscriber__isnull=True, then=Value('')),
+                    default=label_expression(HistoricalPerson, 'inscriber__'),
+                    output_field=TextField(),
+                ),
+                **{f'{name}_labels': m2m_labels(name) for name in INSCRIPTION_M2M_FIELDS},
+            )
+            .order_by('pk')
+            .values_list(*(source for header, source in COLUMNS))
         )
 
-        self.stdout.write(f'Found {inscriptions.count()} inscriptions with transcription data')
-
-        # Define CSV headers
-        headers = [
-            'id', 'title', 'position_on_surface', 'panel_title', 'panel_room',
-            'type_of_inscription', 'genres', 'tags', 'elevation', 'height', 'width',
-            'language', 'writing_system', 'min_year', 'max_year', 'dating_criteria',
-            'transcription', 'interpretative_edition', 'romanisation',
-            'mentioned_persons', 'inscriber', 'translation_eng', 'translation_ukr',
-            'comments_eng', 'comments_ukr', 'conditions', 'alignments',
-            'extra_alphabetical_signs', 'bibliography_items', 'authors',
-            'created_at', 'updated_at'
-        ]
-
-        # Write to CSV
-        with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        started = time.monotonic()
+        exported = 0
+        opener = gzip.open if options['gzip'] else open
+        with opener(output_file, 'wt', newline='', encoding='utf-8') as csvfile:
             writer = csv.writer(csvfile)
-            writer.writerow(headers)
-
-            for inscription in inscriptions:
-                # Helper function to safely get string representation
-                def safe_str(obj):
-                    return str(obj) if obj is not None else ''
-
-                # Helper function to join many-to-many relationships
-                def join_m2m(queryset, attr='__str__'):
-                    if attr == '__str__':
-                        return '; '.join([str(obj) for obj in queryset.all()])
-                    else:
-                        return '; '.join([getattr(obj, attr, '') for obj in queryset.all()])
+            writer.writerow([header for header, source in COLUMNS])
 
-                # Prepare row data
-                row = [
-                    inscription.id,
-                    safe_str(inscription.title),
-                    safe_str(inscription.position_on_surface),
-                    safe_str(inscription.panel.title if inscription.panel else ''),
-                    safe_str(inscription.panel.room if inscription.panel else ''),
-                    safe_str(inscription.type_of_inscription),
-                    join_m2m(inscription.genre),
-                    join_m2m(inscription.tags),
-                    safe_str(inscription.elevation),
-                    safe_str(inscription.height),
-                    safe_str(inscription.width),
-                    safe_str(inscription.language),
-                    safe_str(inscription.writing_system),
-                    safe_str(inscription.min_year),
-                    safe_str(inscription.max_year),
-                    join_m2m(inscription.dating_criteria),
-                    safe_str(inscription.transcription),
-                    safe_str(inscription.interpretative_edition),
-                    safe_str(inscription.romanisation),
-                    join_m2m(inscription.mentioned_person),
-                    safe_str(inscription.inscriber),
-                    safe_str(inscription.translation_eng),
-                    safe_str(inscription.translation_ukr),
-                    safe_str(inscription.comments_eng),
-                    safe_str(inscription.comments_ukr),
-                    join_m2m(inscription.condition),
-                    join_m2m(inscription.alignment),
-                    join_m2m(inscription.extra_alphabetical_sign),
-                    join_m2m(inscription.bibliography),
-                    join_m2m(inscription.author),
-                    safe_str(inscription.created_at),
-                    safe_str(inscription.updated_at)
-                ]
-
-                writer.writerow(row)
+            for row in inscriptions.iterator(chunk_size=options['chunk_size']):
+                writer.writerow(['' if value is None else value for value in row])
+                exported += 1
 
+        elapsed = time.monotonic() - started
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully exported {inscriptions.count()} inscriptions to {output_file}'
+                f'Successfully exported {exported} inscriptions to {output_file} '
+                f'in {elapsed:.1f}s ({exported / elapsed if elapsed else 0:,.0f} rows/s)'
             )
         )
 
         # Display file size
         file_size = os.path.getsize(output_file)
         self.stdout.write(f'File size: {file_size:,} bytes')
+
+    def parse_since(self, value):
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f'--since must be an ISO 8601 date or datetime, got {value!r}')
+            since = datetime.combine(day, datetime.min.time())
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
@@ -0,0 +1,160 @@
+import json
+import os
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from apps.inscriptions import models
+from apps.inscriptions.exports import INSCRIPTION_M2M_FIELDS, m2m_ids, through_rows
+
+# vocabularies and other small tables referenced by inscriptions and panels
+VOCABULARY_MODELS = [
+    models.Tag, models.Language, models.ImageType, models.InscriptionType,
+    models.ExtraAlphabeticalSign, models.GraffitiCondition, models.GraffitiAlignment,
+    models.Genre, models.DatingCriterium, models.WritingSystem, models.Medium,
+    models.Material, models.Section, models.Author, models.HistoricalPerson,
+    models.BibliographyItem, models.Documentation,
+]
+
+
+class Command(BaseCommand):
+    help = ('Export inscriptions, panels, vocabularies and many-to-many link tables '
+            'as typed Parquet files (requires pyarrow)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            type=str,
+            default=None,
+            help='Directory for the Parquet files (default: inscriptions_parquet_TIMESTAMP)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of rows per record batch, and fetched from the database at a time (default: 5000)'
+        )
+        parser.add_argument(
+            '--compression',
+            type=str,
+            default='zstd',
+            help='Parquet compression codec (default: zstd)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise CommandError('export_inscriptions_parquet requires pyarrow, install it with: pip install pyarrow')
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.batch_size = options['batch_size']
+        self.compression = options['compression']
+
+        if options['output_dir']:
+            self.output_dir = options['output_dir']
+        else:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            self.output_dir = f'inscriptions_parquet_{timestamp}'
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        # inscriptions: stored columns, plain-text copies of the RichText fields and
+        # the ids of every many-to-many relation as list columns
+        inscription_fields = [
+            field for field in models.Inscription._meta.concrete_fields
+            if field.name not in models.Inscription.DERIVED_FIELDS
+        ]
+        plain_fields = [models.Inscription._meta.get_field(name) for name in models.Inscription.PLAIN_TEXT_FIELDS]
+        self.export(
+            'inscription',
+            models.Inscription.objects.order_by('pk').values(
+                *(field.attname for field in inscription_fields + plain_fields),
+                **{f'{name}_ids': m2m_ids(name) for name in INSCRIPTION_M2M_FIELDS},
+            ),
+            [self.column(field) for field in inscription_fields + plain_fields]
+            + [(f'{name}_ids', self.pa.list_(self.pa.int64()), None) for name in INSCRIPTION_M2M_FIELDS],
+        )
+
+        self.export_model(models.Panel)
+        for model in VOCABULARY_MODELS:
+            self.export_model(model)
+
+        # link tables of the many-to-many relations
+        for model, field_names in ((models.Inscription, INSCRIPTION_M2M_FIELDS), (models.Panel, ['documentation', 'tags'])):
+            for name in field_names:
+                rows, target = through_rows(name, model)
+                source = f'{model._meta.get_field(name).m2m_field_name()}_id'
+                self.export(
+                    f'{model._meta.model_name}_{name}',
+                    rows.order_by(source, target).values(source, target),
+                    [(source, self.pa.int64(), None), (target, self.pa.int64(), None)],
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'Exported Parquet files to {self.output_dir}'))
+
+    def export_model(self, model):
+        fields = model._meta.concrete_fields
+        self.export(
+            model._meta.model_name,
+            model.objects.order_by('pk').values(*(field.attname for field in fields)),
+            [self.column(field) for field in fields],
+        )
+
+    def column(self, field):
+        """(name, Arrow type, Python converter or None) of a model field."""
+        return (field.attname, *self.arrow_type(field))
+
+    def arrow_type(self, field):
+        """(Arrow type, Python converter or None) of the values of a model field."""
+        pa = self.pa
+        internal_type = field.get_internal_type()
+        if field.is_relation or internal_type in ('AutoField', 'BigAutoField', 'IntegerField',
+                                                  'BigIntegerField', 'SmallIntegerField',
+                                                  'PositiveIntegerField', 'PositiveSmallIntegerField'):
+            return pa.int64(), None
+        if internal_type == 'FloatField':
+            return pa.float64(), None
+        if internal_type == 'BooleanField':
+            return pa.bool_(), None
+        if internal_type == 'DateTimeField':
+            return pa.timestamp('us', tz='UTC'), None
+        if internal_type == 'DateField':
+            return pa.date32(), None
+        if internal_type == 'JSONField':
+            return pa.string(), json.dumps
+        if internal_type == 'ArrayField':
+            # a list column of the type of the elements
+            item_type, convert_item = self.arrow_type(field.base_field)
+            if convert_item is None:
+                return pa.list_(item_type), None
+            return pa.list_(item_type), lambda items: [None if item is None else convert_item(item) for item in items]
+        if internal_type in ('GeometryField', 'PointField', 'PolygonField', 'MultiPolygonField', 'LineStringField'):
+            # well-known binary
+            return pa.binary(), lambda geometry: bytes(geometry.wkb)
+        return pa.string(), str
+
+    def export(self, name, rows, columns):
+        """Write *rows* (a values() queryset) to <name>.parquet in record batches."""
+        schema = self.pa.schema([(column, arrow_type) for column, arrow_type, convert in columns])
+        converters = [(column, convert) for column, arrow_type, convert in columns if convert is not None]
+        path = os.path.join(self.output_dir, f'{name}.parquet')
+
+        started = time.monotonic()
+        exported = 0
+        with self.pq.ParquetWriter(path, schema, compression=self.compression) as writer:
+            batch = []
+            for row in rows.iterator(chunk_size=self.batch_size):
+                for column, convert in converters:
+                    if row[column] is not None:
+                        row[column] = convert(row[column])
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    writer.write_batch(self.pa.RecordBatch.from_pylist(batch, schema=schema))
+                    exported += len(batch)
+                    batch = []
+            if batch:
+                writer.write_batch(self.pa.RecordBatch.from_pylist(batch, schema=schema))
+                exported += len(batch)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'{name}: {exported} rows in {elapsed:.1f}s')
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from apps.inscriptions.dimensions import DimensionFetcher
+from apps.inscriptions.models import Image
+
+
+class Command(BaseCommand):
+    help = 'Fetch the width and height of images that have none from their IIIF info.json'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of images stored at a time (default: 50)'
+        )
+        parser.add_argument(
+            '--base-url',
+            help='IIIF server to read info.json from (default: settings.IIIF_URL)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Also refetch images that already have dimensions'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fetcher = DimensionFetcher(base_url=options['base_url'])
+
+        images = Image.objects.exclude(iiif_file='')
+        if not options['all']:
+            images = images.filter(Q(width__isnull=True) | Q(height__isnull=True))
+        pks = list(images.order_by('pk').values_list('pk', flat=True))
+
+        stored = 0
+        for start in range(0, len(pks), batch_size):
+            stored += fetcher.update(pks[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(f'Stored dimensions of {stored} of {len(pks)} images'))
+        if stored < len(pks):
+            self.stdout.write(self.style.WARNING(f'{len(pks) - stored} images could not be read, see the log'))
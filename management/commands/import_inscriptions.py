@@ -0,0 +1,112 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+import django
+from django.core.management.base import BaseCommand, CommandError
+from apps.inscriptions.imports import check_references, clean_row, create_inscriptions
+
+
+class Command(BaseCommand):
+    help = ('Import inscriptions from a CSV, JSON or NDJSON file: rows are validated in worker processes '
+            'and inserted in batches with bulk_create, many-to-many links included')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', type=str, help='CSV, JSON (a list of objects) or NDJSON file')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'json', 'ndjson'],
+            default=None,
+            help='Input format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rows validated and inserted per transaction (default: 500)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of validation worker processes (default: number of CPUs)'
+        )
+        parser.add_argument(
+            '--errors',
+            type=str,
+            default=None,
+            help='Path of the CSV error report (default: import_errors_TIMESTAMP.csv, written if there are errors)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate every row and report errors without writing to the database'
+        )
+
+    def handle(self, *args, **options):
+        path = options['input']
+        input_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if input_format == 'jsonl':
+            input_format = 'ndjson'
+        if input_format not in ('csv', 'json', 'ndjson'):
+            raise CommandError(f'Cannot tell the format of {path}, use --format')
+
+        batch_size = options['batch_size']
+        errors_file = options['errors'] or f"import_errors_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+
+        started = time.monotonic()
+        imported = failed = 0
+        report = []
+
+        rows = enumerate(self.read_rows(path, input_format), start=1)
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                results = [list(result) for result in pool.map(clean_row, [row for number, row in batch], chunksize=50)]
+                check_references(results)
+
+                valid = []
+                for (number, row), (values, m2m, errors) in zip(batch, results):
+                    if errors:
+                        failed += 1
+                        report.extend((number, field, message) for field, message in errors)
+                    else:
+                        valid.append((values, m2m))
+
+                if valid and not options['dry_run']:
+                    create_inscriptions(valid)
+                imported += len(valid)
+                self.stdout.write(f'{imported + failed} rows processed, {failed} with errors')
+
+        elapsed = time.monotonic() - started
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {imported} inscriptions in {elapsed:.1f}s ({imported / elapsed if elapsed else 0:,.0f} rows/s)'
+        ))
+
+        if report:
+            with open(errors_file, 'w', newline='', encoding='utf-8') as output:
+                writer = csv.writer(output)
+                writer.writerow(['row', 'field', 'error'])
+                writer.writerows(report)
+            self.stdout.write(self.style.WARNING(f'{failed} rows were not imported, see {errors_file}'))
+
+    def read_rows(self, path, input_format):
+        """Yield the records of the input file as dicts."""
+        with open(path, newline='', encoding='utf-8') as input_file:
+            if input_format == 'csv':
+                yield from csv.DictReader(input_file)
+            elif input_format == 'ndjson':
+                for line in input_file:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                records = json.load(input_file)
+                if not isinstance(records, list):
+                    raise CommandError('A JSON input must be a list of objects')
+                yield from records
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.inscriptions.epidoc import epidoc_inscriptions
+from apps.inscriptions.models import EpiDocToken, Inscription
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the word tokens read from the EpiDoc editions of all inscriptions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of inscriptions loaded from the database at a time (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        inscriptions = epidoc_inscriptions().only('pk', *Inscription.EPIDOC_FIELDS).order_by('pk')
+
+        tokens = 0
+        with transaction.atomic():
+            EpiDocToken.objects.all().delete()
+            batch = []
+            for inscription in inscriptions.iterator(chunk_size=chunk_size):
+                batch.extend(inscription.get_epidoc_tokens())
+                if len(batch) >= chunk_size:
+                    tokens += len(EpiDocToken.objects.bulk_create(batch))
+                    batch = []
+            if batch:
+                tokens += len(EpiDocToken.objects.bulk_create(batch))
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {tokens} EpiDoc tokens'))
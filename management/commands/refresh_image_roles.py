@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from apps.inscriptions.models import Image
+
+
+class Command(BaseCommand):
+    help = 'Derive the role (orthophoto, blended, texture or normal map) of every image'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of images loaded from the database at a time (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        images = Image.objects.all().select_related('type_of_image').order_by('pk')
+
+        changed = []
+        for image in images.iterator(chunk_size=chunk_size):
+            role = image.derive_role()
+            if role != image.role:
+                image.role = role
+                changed.append(image)
+
+        Image.objects.bulk_update(changed, ['role'], batch_size=chunk_size)
+        self.stdout.write(self.style.SUCCESS(f'Updated the role of {len(changed)} images'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from apps.inscriptions.models import Inscription
+
+
+class Command(BaseCommand):
+    help = ('Recompute the data that Inscription derives from its own fields on save '
+            '(plain-text copies and cleaned variants of RichText fields, numeric positions, '
+            'search vectors, denominations, autocomplete suggestions)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of inscriptions loaded from the database at a time (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        inscriptions = (
+            Inscription.objects.all()
+            .select_related('panel')
+            .prefetch_related('mentioned_person', 'korniienko_image')
+            .order_by('pk')
+        )
+
+        refreshed = 0
+        batch = []
+        for inscription in inscriptions.iterator(chunk_size=chunk_size):
+            inscription.update_presave_fields()
+            batch.append(inscription)
+            if len(batch) >= chunk_size:
+                refreshed += self.refresh(batch)
+                batch = []
+        if batch:
+            refreshed += self.refresh(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Refreshed derived data of {refreshed} inscriptions'))
+
+    def refresh(self, inscriptions):
+        Inscription.objects.bulk_update(inscriptions, Inscription.PRESAVE_FIELDS)
+        # the search vector is computed in SQL from the plain-text columns written above
+        Inscription.objects.filter(pk__in=[inscription.pk for inscription in inscriptions]).update(
+            search_vector=Inscription.search_vector_expression(),
+            denomination=Inscription.denomination_expression(),
+        )
+        for inscription in inscriptions:
+            inscription.update_suggestions()
+        return len(inscriptions)
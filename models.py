@@ -5,8 +5,35 @@ from ckeditor.fields import RichTextField
 from django.utils.translation import gettext_lazy as _
 from saintsophia.storages import OriginalFileStorage
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Concat, Upper
+from django.utils.html import strip_tags
 from lxml import etree
+from .richtext import clean_rich_text_variants
+from .tokens import epidoc_tokens
+import html
+import unicodedata
+
+# Text search configuration for the inscription search vector. The corpus mixes
+# Church Slavonic, Greek, Ukrainian and English, so words are not stemmed.
+SEARCH_CONFIG = 'simple'
+
+
+def rich_text_to_plain(value):
+    """Strip HTML tags, decode entities and NFC-normalize a RichText value.
+
+    CKEditor stores Greek / Cyrillic / other non-ASCII text as HTML named
+    entities (e.g. &delta;&omicron;&upsilon;...), which this turns back into
+    the characters users actually type.
+    """
+    if not value:
+        return ''
+    return unicodedata.normalize('NFC', html.unescape(strip_tags(value))).strip()
+
 
 def validate_position_on_surface(value):
     try:
@@ -22,14 +49,58 @@ def validate_position_on_surface(value):
         raise ValidationError("Position on surface must have 4 numeric values after 'pct:'")
     
 
-def validate_epidoc_xml(value: str):
-    if not value:
-        return
+def parse_position_on_surface(value):
+    """Return the (x, y, width, height) percentages of a pct:x,y,w,h position, or None."""
+    try:
+        validate_position_on_surface(value)
+    except (ValidationError, AttributeError):
+        return None
+    return tuple(float(part) for part in value.split(":")[1].split(","))
+
+
+def region_overlap_q(x, y, width, height):
+    """Q matching inscriptions whose stored rectangle overlaps the given pct rectangle."""
+    return Q(
+        position_x__lt=x + width,
+        position_y__lt=y + height,
+        position_x__gt=x - F('position_width'),
+        position_y__gt=y - F('position_height'),
+    )
+
+
+def parse_epidoc_xml(value: str):
+    """Parse an EpiDoc document, raising ValidationError if it is not well-formed."""
     try:
-        etree.fromstring(value.encode("utf-8"))
+        return etree.fromstring(value.encode("utf-8"))
     except etree.XMLSyntaxError as exc:
         raise ValidationError(f"Invalid XML: {exc}") from exc
 
+
+def validate_epidoc_xml(value: str):
+    if not value:
+        return
+    parse_epidoc_xml(value)
+
+
+class NeighborsMixin:
+    """Previous and next objects in primary key order, found with indexed keyset lookups."""
+
+    def next(self):
+        return type(self).objects.filter(pk__gt=self.pk).order_by('pk').first()
+
+    def previous(self):
+        return type(self).objects.filter(pk__lt=self.pk).order_by('-pk').first()
+
+    @classmethod
+    def neighbors(cls, pks):
+        """Map each existing pk of *pks* to its (previous pk, next pk), in one query."""
+        rows = cls.objects.filter(pk__in=pks).annotate(
+            previous_pk=Subquery(cls.objects.filter(pk__lt=OuterRef('pk')).order_by('-pk').values('pk')[:1]),
+            next_pk=Subquery(cls.objects.filter(pk__gt=OuterRef('pk')).order_by('pk').values('pk')[:1]),
+        ).values_list('pk', 'previous_pk', 'next_pk')
+        return {pk: (previous_pk, next_pk) for pk, previous_pk, next_pk in rows}
+
+
 # DEFINE TAG MODELS
 
 class Tag(abstract.AbstractTagModel):
@@ -279,7 +350,7 @@ class Documentation(abstract.AbstractBaseModel):
         verbose_name = _("Documentation")
     
 
-class Panel(abstract.AbstractBaseModel):   
+class Panel(NeighborsMixin, abstract.AbstractBaseModel):   
     title = models.CharField(max_length=256, null=True, blank=True, verbose_name=_("title"), help_text=_("this field refers to the surface designation"))
     room = models.CharField(max_length=256, null=True, blank=True, verbose_name=_("room"), help_text=_("this field refers to the room in which the surface stands"))
     geometry = models.GeometryField(verbose_name=_("geometry"), blank=True, null=True)
@@ -304,36 +375,33 @@ class Panel(abstract.AbstractBaseModel):
     
     data_available = models.IntegerField(choices=DataForPanel.choices, default=DataForPanel.POSITION)
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_title()
+        return instance
+
+    def _remember_title(self):
+        # title as loaded or last saved; inscriptions copy it into derived data
+        if 'title' in self.__dict__:
+            self._saved_title = self.title
+
+    def title_changed(self):
+        """Whether the title differs from the one loaded or last saved (True if unknown)."""
+        return not hasattr(self, '_saved_title') or self.__dict__.get('title') != self._saved_title
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_title()
+
     def __str__(self) -> str:
         return f"Surface {self.title}"
 
     class Meta:
         verbose_name = _("Surface")
-        
-    def list_all_pk(self):
-        all_pk = []
-        for obj in Panel.objects.all().order_by('pk'):
-            all_pk.append(obj.pk)
-        return all_pk
-        
-    def next(self):
-        all_pk = self.list_all_pk()
-        current_index = all_pk.index(self.pk)
-        try: 
-            return Panel.objects.get(pk=all_pk[current_index+1])
-        except: 
-            return None
-        
-    def previous(self):
-        all_pk = self.list_all_pk()
-        current_index = all_pk.index(self.pk)
-        try:
-            return Panel.objects.get(pk=all_pk[current_index-1])
-        except:
-            return None
 
 
-class Inscription(abstract.AbstractBaseModel):
+class Inscription(NeighborsMixin, abstract.AbstractBaseModel):
     # metadata
     position_on_surface = models.CharField(max_length=128, blank=True, null=True, verbose_name=_("Position on surface"), help_text=_("Position on the surface (PASTE HERE LINK COPIED IN CLIPBOARD)"), validators=[validate_position_on_surface])
     title = models.CharField(max_length=256, null=True, blank=True, verbose_name=_("Alternative title"), help_text=_("Fill in if the inscription is known by an alternative name"))
@@ -375,6 +443,59 @@ class Inscription(abstract.AbstractBaseModel):
     # bibliography and contributions
     bibliography = models.ManyToManyField(BibliographyItem, blank=True, help_text=_("Add bibliography items"), related_name="inscriptions")
     author = models.ManyToManyField(Author, blank=True, verbose_name=_("Contributors"), help_text=_("List of authors for this inscription"))
+
+    # plain-text copies of the RichText fields, maintained on save and used for searching
+    transcription_plain = models.TextField(null=True, blank=True, editable=False)
+    interpretative_edition_plain = models.TextField(null=True, blank=True, editable=False)
+    romanisation_plain = models.TextField(null=True, blank=True, editable=False)
+    translation_eng_plain = models.TextField(null=True, blank=True, editable=False)
+    translation_ukr_plain = models.TextField(null=True, blank=True, editable=False)
+    comments_eng_plain = models.TextField(null=True, blank=True, editable=False)
+    comments_ukr_plain = models.TextField(null=True, blank=True, editable=False)
+
+    # full-text search, maintained on save from the SEARCH_FIELDS below
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+
+    # position_on_surface as numbers (percentages of the surface), maintained on save
+    position_x = models.FloatField(null=True, blank=True, editable=False)
+    position_y = models.FloatField(null=True, blank=True, editable=False)
+    position_width = models.FloatField(null=True, blank=True, editable=False)
+    position_height = models.FloatField(null=True, blank=True, editable=False)
+
+    # "<panel title>:<id>", the name inscriptions are looked up by; maintained on save
+    denomination = models.CharField(max_length=300, null=True, blank=True, editable=False)
+
+    # cleaned variants of the RichText fields served by the API, see richtext.py
+    rich_text_cache = models.JSONField(null=True, blank=True, editable=False)
+
+    RICH_TEXT_FIELDS = [
+        'transcription', 'interpretative_edition', 'romanisation',
+        'translation_eng', 'translation_ukr', 'comments_eng', 'comments_ukr',
+    ]
+    PLAIN_TEXT_FIELDS = [f'{field}_plain' for field in RICH_TEXT_FIELDS]
+    EPIDOC_FIELDS = ['epidoc_text', 'epidoc_interpretation']
+    POSITION_FIELDS = ['position_x', 'position_y', 'position_width', 'position_height']
+
+    # columns computed in Python before saving
+    PRESAVE_FIELDS = PLAIN_TEXT_FIELDS + POSITION_FIELDS + ['rich_text_cache']
+
+    # columns computed by save() that are neither edited nor exposed through the API
+    DERIVED_FIELDS = PRESAVE_FIELDS + ['search_vector', 'denomination']
+
+    # RichText fields indexed in search_vector
+    SEARCH_FIELDS = [
+        'transcription', 'interpretative_edition', 'romanisation',
+        'translation_eng', 'translation_ukr',
+    ]
+
+    # RichText fields offered as autocomplete suggestions, with their source label
+    SUGGESTION_FIELDS = [
+        ('transcription', 'Transcription'),
+        ('interpretative_edition', 'Interpretative Edition'),
+        ('romanisation', 'Romanisation'),
+        ('translation_eng', 'Translation (ENG)'),
+        ('translation_ukr', 'Translation (UKR)'),
+    ]
     
     # Position of surface should follow something like this format: pct:9.27,61.42,4.70,2.45
     def clean(self):
@@ -382,10 +503,187 @@ class Inscription(abstract.AbstractBaseModel):
         if self.position_on_surface:
             validate_position_on_surface(self.position_on_surface)
     
-    def save(self, *args, **kwargs):
-        self.full_clean()  # This will call the clean() method and validate the position_on_surface
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_epidoc()
+        return instance
+
+    def _remember_epidoc(self):
+        # EpiDoc values as loaded or last saved, so that unchanged documents are not validated again
+        self._saved_epidoc = {field: self.__dict__[field] for field in self.EPIDOC_FIELDS if field in self.__dict__}
+
+    def parsed_epidoc(self, field):
+        """Root element of the EpiDoc *field*, or None if it is empty; raises
+        ValidationError if it is not well-formed.
+
+        The parse is kept on the instance until the next save, so validating
+        and tokenizing a document parse it only once.
+        """
+        value = getattr(self, field)
+        if not value:
+            return None
+        parsed = self.__dict__.setdefault('_parsed_epidoc', {})
+        if field not in parsed or parsed[field][0] != value:
+            try:
+                parsed[field] = (value, parse_epidoc_xml(value), None)
+            except ValidationError as error:
+                parsed[field] = (value, None, error)
+        _, root, error = parsed[field]
+        if error is not None:
+            raise error
+        return root
+
+    def clean_fields(self, exclude=None):
+        # EpiDoc fields are checked through parsed_epidoc() rather than their
+        # validate_epidoc_xml validator, so that the parse can be reused
+        exclude = set(exclude or ())
+        errors = {}
+        try:
+            super().clean_fields(exclude=exclude | set(self.EPIDOC_FIELDS))
+        except ValidationError as error:
+            errors = error.update_error_dict(errors)
+        for field in self.EPIDOC_FIELDS:
+            if field not in exclude:
+                try:
+                    self.parsed_epidoc(field)
+                except ValidationError as error:
+                    errors.setdefault(field, []).extend(error.messages)
+        if errors:
+            raise ValidationError(errors)
+
+    def clean_exclude(self, update_fields=None):
+        """Fields full_clean() can skip on save: unchanged EpiDoc documents, and
+        every field not being saved when *update_fields* is given."""
+        exclude = {
+            field for field, value in getattr(self, '_saved_epidoc', {}).items()
+            if self.__dict__.get(field) == value
+        }
+        if update_fields is not None:
+            exclude |= {
+                field.name for field in self._meta.concrete_fields
+                if field.name not in update_fields and field.attname not in update_fields
+            }
+        return exclude
+
+    def save(self, *args, validate=True, **kwargs):
+        """Validate and save the inscription.
+
+        ``validate=False`` skips full_clean() for trusted bulk updates of data
+        that was validated before.
+        """
+        unchanged = self.clean_exclude(kwargs.get('update_fields'))
+        if validate:
+            # This will call the clean() method and validate the position_on_surface
+            self.full_clean(exclude=unchanged)
+        self.update_presave_fields()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *self.PRESAVE_FIELDS}
         super().save(*args, **kwargs)
-            
+        self._remember_epidoc()
+        self.update_search_vector()
+        self.update_denomination()
+        self.update_suggestions()
+        self.update_epidoc_tokens([field for field in self.EPIDOC_FIELDS if field not in unchanged])
+        self.__dict__.pop('_parsed_epidoc', None)
+
+    def update_presave_fields(self):
+        """Refresh all PRESAVE_FIELDS (not saved)."""
+        self.update_plain_text()
+        self.update_position()
+        self.update_rich_text_cache()
+
+    def update_plain_text(self):
+        """Refresh the plain-text copies of the RichText fields (not saved)."""
+        for field in self.RICH_TEXT_FIELDS:
+            setattr(self, f'{field}_plain', rich_text_to_plain(getattr(self, field)))
+
+    def update_position(self):
+        """Refresh the numeric copies of position_on_surface (not saved)."""
+        position = parse_position_on_surface(self.position_on_surface) or (None,) * 4
+        for field, value in zip(self.POSITION_FIELDS, position):
+            setattr(self, field, value)
+
+    def update_rich_text_cache(self):
+        """Refresh the cleaned variants of the non-empty RichText fields (not saved)."""
+        self.rich_text_cache = {
+            field: clean_rich_text_variants(getattr(self, field))
+            for field in self.RICH_TEXT_FIELDS if getattr(self, field)
+        }
+
+    def overlapping(self):
+        """Other inscriptions of the same surface whose rectangles overlap this one."""
+        if self.position_x is None or self.panel_id is None:
+            return Inscription.objects.none()
+        return Inscription.objects.filter(
+            region_overlap_q(self.position_x, self.position_y, self.position_width, self.position_height),
+            panel_id=self.panel_id,
+        ).exclude(pk=self.pk)
+
+    @staticmethod
+    def search_vector_expression():
+        """Expression computing search_vector from the plain-text columns."""
+        return SearchVector(*(f'{field}_plain' for field in Inscription.SEARCH_FIELDS), config=SEARCH_CONFIG)
+
+    def update_search_vector(self):
+        """Rebuild the stored search vector of this inscription."""
+        Inscription.objects.filter(pk=self.pk).update(search_vector=self.search_vector_expression())
+
+    @staticmethod
+    def denomination_expression():
+        """Expression computing denomination from the surface title and the id."""
+        panel_title = Subquery(Panel.objects.filter(pk=OuterRef('panel_id')).values('title')[:1])
+        return Concat(panel_title, Value(':'), Cast('pk', models.CharField()), output_field=models.CharField())
+
+    def update_denomination(self):
+        """Rebuild the stored denomination of this inscription."""
+        Inscription.objects.filter(pk=self.pk).update(denomination=self.denomination_expression())
+
+    def get_suggestion_values(self):
+        """Yield (plain-text value, source label) pairs offered for autocomplete."""
+        yield rich_text_to_plain(self.title), 'Title'
+        if self.panel is not None:
+            yield rich_text_to_plain(self.panel.title), 'Panel Title'
+        for field, label in self.SUGGESTION_FIELDS:
+            yield getattr(self, f'{field}_plain'), label
+        for person in self.mentioned_person.all():
+            yield rich_text_to_plain(person.name), 'Mentioned Person'
+        for image in self.korniienko_image.all():
+            yield rich_text_to_plain(image.title), 'Korniienko Image Title'
+
+    def update_suggestions(self):
+        """Replace the autocomplete suggestions of this inscription."""
+        suggestions = {}
+        for value, source in self.get_suggestion_values():
+            if value:
+                # first-seen casing is kept for display
+                suggestions.setdefault((value.lower(), source), value)
+
+        with transaction.atomic():
+            InscriptionSuggestion.objects.filter(inscription=self).delete()
+            InscriptionSuggestion.objects.bulk_create([
+                InscriptionSuggestion(inscription=self, value=value, normalized=normalized, source=source)
+                for (normalized, source), value in suggestions.items()
+            ])
+
+    def get_epidoc_tokens(self, fields=None):
+        """Unsaved EpiDocToken rows of the EpiDoc *fields* (all of them by default)."""
+        for field in fields if fields is not None else self.EPIDOC_FIELDS:
+            try:
+                root = self.parsed_epidoc(field)
+            except ValidationError:
+                root = None
+            for token in epidoc_tokens(root):
+                yield EpiDocToken(inscription_id=self.pk, source=field, **token)
+
+    def update_epidoc_tokens(self, fields=None):
+        """Replace the word tokens of the EpiDoc *fields* (all of them by default)."""
+        fields = self.EPIDOC_FIELDS if fields is None else fields
+        if not fields:
+            return
+        with transaction.atomic():
+            EpiDocToken.objects.filter(inscription=self, source__in=fields).delete()
+            EpiDocToken.objects.bulk_create(self.get_epidoc_tokens(fields))
 
     def __str__(self) -> str:
         if (self.title) is not None:
@@ -395,29 +693,75 @@ class Inscription(abstract.AbstractBaseModel):
 
     class Meta:
         verbose_name = _("Inscription")
+        indexes = [
+            GinIndex(fields=['search_vector'], name='inscription_search_vector_idx'),
+            # serve icontains on the plain-text columns (UPPER(col) LIKE UPPER(%term%)), needs pg_trgm
+            GinIndex(OpClass(Upper('transcription_plain'), name='gin_trgm_ops'), name='insc_transcription_trgm'),
+            GinIndex(OpClass(Upper('interpretative_edition_plain'), name='gin_trgm_ops'), name='insc_interpretative_trgm'),
+            GinIndex(OpClass(Upper('romanisation_plain'), name='gin_trgm_ops'), name='insc_romanisation_trgm'),
+            GinIndex(OpClass(Upper('translation_eng_plain'), name='gin_trgm_ops'), name='insc_translation_eng_trgm'),
+            GinIndex(OpClass(Upper('translation_ukr_plain'), name='gin_trgm_ops'), name='insc_translation_ukr_trgm'),
+            # prefix lookups on the denomination (LIKE 'term%')
+            models.Index(fields=['denomination'], name='inscription_denomination_idx', opclasses=['varchar_pattern_ops']),
+            # region queries are always within one surface
+            models.Index(fields=['panel', 'position_x', 'position_y'], name='inscription_position_idx'),
+        ]
 
 
-    def list_all_pk(self):
-        all_pk = []
-        for obj in Inscription.objects.all().order_by('pk'):
-            all_pk.append(obj.pk)
-        return all_pk
-        
-    def next(self):
-        all_pk = self.list_all_pk()
-        current_index = all_pk.index(self.pk)
-        try: 
-            return Inscription.objects.get(pk=all_pk[current_index+1])
-        except: 
-            return None
-        
-    def previous(self):
-        all_pk = self.list_all_pk()
-        current_index = all_pk.index(self.pk)
-        try:
-            return Inscription.objects.get(pk=all_pk[current_index-1])
-        except:
-            return None
+class InscriptionSuggestion(models.Model):
+    """One autocomplete entry: a searchable value of an inscription and the field it comes from.
+
+    Rows are derived data, rebuilt by Inscription.update_suggestions() on save
+    and by the signals on related models.
+    """
+    inscription = models.ForeignKey(Inscription, on_delete=models.CASCADE, related_name="suggestions")
+    value = models.TextField(verbose_name=_("Value"))
+    normalized = models.TextField(verbose_name=_("Normalized value"), help_text=_("Lowercase value matched against the query"))
+    source = models.CharField(max_length=64, verbose_name=_("Source"))
+
+    def __str__(self) -> str:
+        return f"{self.source}: {self.value}"
+
+    class Meta:
+        verbose_name = _("Inscription suggestion")
+        verbose_name_plural = _("Inscription suggestions")
+        indexes = [
+            # needs the pg_trgm extension
+            GinIndex(fields=['normalized'], name='inscription_suggestion_trgm', opclasses=['gin_trgm_ops']),
+        ]
+
+
+class EpiDocToken(models.Model):
+    """One word (``<w>``) of the EpiDoc transcription or interpretation of an inscription.
+
+    Rows are derived data, rebuilt by Inscription.update_epidoc_tokens() on save
+    and by the refresh_epidoc_tokens command.
+    """
+    inscription = models.ForeignKey(Inscription, on_delete=models.CASCADE, related_name="epidoc_tokens")
+    source = models.CharField(max_length=32, verbose_name=_("Source"), help_text=_("EpiDoc field the word is read from"))
+    position = models.PositiveIntegerField(verbose_name=_("Position"), help_text=_("Word number in the document, from 0"))
+    form = models.TextField(verbose_name=_("Form"), help_text=_("The word as read, abbreviations expanded"))
+    normalized = models.TextField(verbose_name=_("Normalized form"), help_text=_("Lowercase form without diacritics, matched against queries"))
+    lemma = models.CharField(max_length=256, blank=True, verbose_name=_("Lemma"))
+    abbreviated = models.BooleanField(default=False, verbose_name=_("Abbreviated"), help_text=_("The form includes an editorial expansion"))
+    unclear = models.BooleanField(default=False, verbose_name=_("Unclear"))
+    supplied = models.BooleanField(default=False, verbose_name=_("Supplied"))
+
+    def __str__(self) -> str:
+        return self.form
+
+    class Meta:
+        verbose_name = _("EpiDoc token")
+        verbose_name_plural = _("EpiDoc tokens")
+        indexes = [
+            # exact and prefix lookups (LIKE 'term%')
+            models.Index(fields=['normalized'], name='epidoc_token_normalized_idx', opclasses=['text_pattern_ops']),
+            models.Index(fields=['lemma'], name='epidoc_token_lemma_idx', opclasses=['varchar_pattern_ops']),
+        ]
+        constraints = [
+            # also serves the context windows of the concordance
+            models.UniqueConstraint(fields=['inscription', 'source', 'position'], name='epidoc_token_position_unique'),
+        ]
     
         
 class PanelOrInscription(models.IntegerChoices):
@@ -425,6 +769,22 @@ class PanelOrInscription(models.IntegerChoices):
     INSCRIPTION = 2, "Inscription"
     
 
+class ImageRole(models.IntegerChoices):
+    """What an image shows of a surface, in the order images are listed."""
+    ORTHOPHOTO = 1, "Orthophoto"
+    BLENDED_MAP = 2, "Blended map"
+    TEXTURE_MAP = 3, "Texture map"
+    NORMAL_MAP = 4, "Normal map"
+
+
+# topography maps are told apart by their file name
+TOPOGRAPHY_FILE_ROLES = [
+    ("blended_map", ImageRole.BLENDED_MAP),
+    ("texture_map", ImageRole.TEXTURE_MAP),
+    ("normal_map", ImageRole.NORMAL_MAP),
+]
+
+
 class Image(abstract.AbstractTIFFImageModel):
     panel_or_inscription = models.IntegerField(choices=PanelOrInscription.choices, default=1, verbose_name=_("Surface or inscription"))
     panel = models.ForeignKey(Panel, null=True, blank=True, on_delete=models.CASCADE, related_name="images", verbose_name=_("Surface"))
@@ -435,12 +795,37 @@ class Image(abstract.AbstractTIFFImageModel):
     # Add width and height fields that we can get them form info.json
     width = models.IntegerField(null=True, blank=True, verbose_name=_("Image width in pixels"))
     height = models.IntegerField(null=True, blank=True, verbose_name=_("Image height in pixels"))
+
+    # derived on save from the image type and file name
+    role = models.IntegerField(choices=ImageRole.choices, null=True, blank=True, editable=False, verbose_name=_("Role"))
     
     def __str__(self) -> str:
         return f"Image for surface {self.panel}"
 
+    def save(self, *args, **kwargs):
+        self.role = self.derive_role()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'role'}
+        super().save(*args, **kwargs)
+
+    def derive_role(self):
+        """The ImageRole of this image, or None for images not listed by role."""
+        type_of_image = self.type_of_image.text if self.type_of_image is not None else None
+        if type_of_image == "Orthophoto":
+            return ImageRole.ORTHOPHOTO
+        if type_of_image == "Topography":
+            file_name = self.file.name if self.file else ""
+            for marker, role in TOPOGRAPHY_FILE_ROLES:
+                if marker in file_name:
+                    return role
+        return None
+
     class Meta:
         verbose_name = _("Image")
+        indexes = [
+            models.Index(fields=['panel', 'role'], name='image_panel_role_idx'),
+            models.Index(fields=['role'], name='image_role_idx'),
+        ]
         
         constraints = [
             models.CheckConstraint(
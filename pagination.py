@@ -0,0 +1,27 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination on the primary key: every page costs the same and rows
+    are never skipped or repeated while the data changes."""
+    ordering = ('id',)
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class OptInCursorPaginationMixin:
+    """Use IdCursorPagination when the request asks for it with ?pagination=cursor
+    (or carries a cursor), and the viewset's usual pagination otherwise."""
+    cursor_pagination_class = IdCursorPagination
+
+    def uses_cursor_pagination(self):
+        params = self.request.query_params
+        return params.get('pagination') == 'cursor' or 'cursor' in params
+
+    @property
+    def paginator(self):
+        if not self.uses_cursor_pagination():
+            return super().paginator
+        if not hasattr(self, '_cursor_paginator'):
+            self._cursor_paginator = self.cursor_pagination_class()
+        return self._cursor_paginator
@@ -0,0 +1,95 @@
+"""Cleaning of CKEditor RichText values for the API.
+
+The cleaned variants are computed once when an inscription is saved (see
+Inscription.rich_text_cache) so that serialization is a lookup.
+"""
+from django.utils.html import strip_tags
+import html
+import re
+
+_BR_RE = re.compile(r'<br\s*/?>', re.IGNORECASE)
+_BLOCK_RE = re.compile(r'</?(p|div)\s*/?>', re.IGNORECASE)
+_TAG_RE = re.compile(r'</?([a-zA-Z0-9]+)(?:\s[^>]*)?>')
+_SCRIPT_STYLE_RE = re.compile(r'<(script|style)\b[^>]*>.*?</\1>', re.IGNORECASE | re.DOTALL)
+_COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+
+
+def _clean_rich_text_keep_p_br(value):
+    """Strip HTML while preserving only normalized <p> and <br /> tags."""
+    if not value:
+        return value
+
+    value = html.unescape(value)
+    value = _SCRIPT_STYLE_RE.sub('', value)
+    value = _COMMENT_RE.sub('', value)
+
+    def _replace_tag(match):
+        raw = match.group(0)
+        tag_name = match.group(1).lower()
+
+        if tag_name == 'p':
+            return '</p>' if raw.lstrip().startswith('</') else '<p>'
+        if tag_name == 'br':
+            return '<br />'
+        return ''
+
+    return _TAG_RE.sub(_replace_tag, value).strip()
+
+
+def _clean_rich_text(value, preserve_breaks=False, preserve_tags=False):
+    """Strip HTML tags and decode entities from a RichText value.
+
+    When *preserve_breaks* is True, ``<br>`` tags and block boundaries
+    (``<p>``, ``</p>``, ``<div>``, …) are converted to newline characters
+    before the remaining markup is removed.
+
+    When *preserve_tags* is True, all HTML is stripped except ``<p>``
+    and ``<br />`` tags (normalized output).
+    """
+    if not value:
+        return value
+    if preserve_tags:
+        return _clean_rich_text_keep_p_br(value)
+    if preserve_breaks:
+        value = _BR_RE.sub('\n', value)
+        value = _BLOCK_RE.sub('\n', value)
+    return html.unescape(strip_tags(value)).strip()
+
+
+# variants of every RichText field stored in Inscription.rich_text_cache
+RICH_TEXT_VARIANTS = {
+    'plain': {},
+    'breaks': {'preserve_breaks': True},
+    'tags': {'preserve_tags': True},
+}
+
+
+def rich_text_variant(preserve_breaks=False, preserve_tags=False):
+    """Name of the cached variant produced by _clean_rich_text with these options."""
+    if preserve_tags:
+        return 'tags'
+    if preserve_breaks:
+        return 'breaks'
+    return 'plain'
+
+
+def clean_rich_text_variants(value):
+    """All cleaned variants of a RichText value, keyed by variant name."""
+    return {variant: _clean_rich_text(value, **options) for variant, options in RICH_TEXT_VARIANTS.items()}
+
+
+def cleaned_rich_text(instance, field, preserve_breaks=False, preserve_tags=False):
+    """Cleaned value of the RichText *field* of an inscription, read from its
+    rich_text_cache when filled and cleaned on the fly otherwise."""
+    return cleaned_rich_text_value(
+        getattr(instance, 'rich_text_cache', None), field, getattr(instance, field),
+        preserve_breaks=preserve_breaks, preserve_tags=preserve_tags,
+    )
+
+
+def cleaned_rich_text_value(rich_text_cache, field, value, preserve_breaks=False, preserve_tags=False):
+    """cleaned_rich_text for a *value* and rich_text_cache read without a model instance."""
+    cached = (rich_text_cache or {}).get(field)
+    if cached is not None:
+        return cached[rich_text_variant(preserve_breaks, preserve_tags)]
+    return _clean_rich_text(value, preserve_breaks=preserve_breaks, preserve_tags=preserve_tags)
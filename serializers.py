@@ -5,57 +5,7 @@ from . import models
 from saintsophia.utils import get_fields, DEFAULT_FIELDS
 from .models import *
 from django.db.models import Q
-from django.utils.html import strip_tags
-import html
-import re
-
-_BR_RE = re.compile(r'<br\s*/?>', re.IGNORECASE)
-_BLOCK_RE = re.compile(r'</?(p|div)\s*/?>', re.IGNORECASE)
-_TAG_RE = re.compile(r'</?([a-zA-Z0-9]+)(?:\s[^>]*)?>')
-_SCRIPT_STYLE_RE = re.compile(r'<(script|style)\b[^>]*>.*?</\1>', re.IGNORECASE | re.DOTALL)
-_COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
-
-
-def _clean_rich_text_keep_p_br(value):
-    """Strip HTML while preserving only normalized <p> and <br /> tags."""
-    if not value:
-        return value
-
-    value = html.unescape(value)
-    value = _SCRIPT_STYLE_RE.sub('', value)
-    value = _COMMENT_RE.sub('', value)
-
-    def _replace_tag(match):
-        raw = match.group(0)
-        tag_name = match.group(1).lower()
-
-        if tag_name == 'p':
-            return '</p>' if raw.lstrip().startswith('</') else '<p>'
-        if tag_name == 'br':
-            return '<br />'
-        return ''
-
-    return _TAG_RE.sub(_replace_tag, value).strip()
-
-
-def _clean_rich_text(value, preserve_breaks=False, preserve_tags=False):
-    """Strip HTML tags and decode entities from a RichText value.
-
-    When *preserve_breaks* is True, ``<br>`` tags and block boundaries
-    (``<p>``, ``</p>``, ``<div>``, …) are converted to newline characters
-    before the remaining markup is removed.
-
-    When *preserve_tags* is True, all HTML is stripped except ``<p>``
-    and ``<br />`` tags (normalized output).
-    """
-    if not value:
-        return value
-    if preserve_tags:
-        return _clean_rich_text_keep_p_br(value)
-    if preserve_breaks:
-        value = _BR_RE.sub('\n', value)
-        value = _BLOCK_RE.sub('\n', value)
-    return html.unescape(strip_tags(value)).strip()
+from .richtext import cleaned_rich_text
 
 
 class LanguageSerializer(DynamicDepthSerializer):
@@ -90,6 +40,23 @@ class BibliographyItemSerializer(DynamicDepthSerializer):
         depth = 1
 
 
+def _panel_languages(panel):
+    """Sorted language names of the inscriptions on *panel*, from the ``language_list``
+    annotation of the panel viewsets when present."""
+    if hasattr(panel, 'language_list'):
+        languages = panel.language_list or []
+    else:
+        languages = panel.inscriptions.filter(language__isnull=False).values_list('language__text', flat=True).distinct()
+    return sorted(languages)
+
+
+def _panel_inscription_count(panel):
+    """Number of inscriptions on *panel*, from the ``inscription_count`` annotation when present."""
+    if hasattr(panel, 'inscription_count'):
+        return panel.inscription_count
+    return panel.inscriptions.count()
+
+
 class PanelSerializer(DynamicDepthSerializer):
 
     list_of_languages = SerializerMethodField()
@@ -100,19 +67,10 @@ class PanelSerializer(DynamicDepthSerializer):
         fields = get_fields(Panel, exclude=DEFAULT_FIELDS)+ ['id', 'list_of_languages', 'number_of_inscriptions']
         
     def get_list_of_languages(self, obj):
-        inscriptions_on_panel = obj.inscriptions.all()
-        
-        languages = []
-        for inscription in inscriptions_on_panel:
-            if inscription.language is not None:
-                languages.append(inscription.language.text)
-        
-        return set(languages)
+        return _panel_languages(obj)
     
     def get_number_of_inscriptions(self, obj):
-        inscriptions_on_panel = obj.inscriptions.all()
-        
-        return len(inscriptions_on_panel)
+        return _panel_inscription_count(obj)
 
 
 class ObjectRTISerializer(DynamicDepthSerializer):
@@ -195,27 +153,13 @@ class PanelMetadataSerializer(DynamicDepthSerializer):
                                                                                 'list_of_languages']
         
     def get_number_of_inscriptions(self, obj):
-        return obj.inscriptions.count()
+        return _panel_inscription_count(obj)
     
     def get_number_of_languages(self, obj):
-        inscriptions_on_panel = obj.inscriptions.all()
-        
-        languages = []
-        for inscription in inscriptions_on_panel:
-            if inscription.language is not None:
-                languages.append(inscription.language.text)
-            
-        return len(set(languages))
+        return len(_panel_languages(obj))
     
     def get_list_of_languages(self, obj):
-        inscriptions_on_panel = obj.inscriptions.all()
-        
-        languages = []
-        for inscription in inscriptions_on_panel:
-            if inscription.language is not None:
-                languages.append(inscription.language.text)
-        
-        return set(languages)
+        return _panel_languages(obj)
         
         
 class PanelCoordinatesSerializer(GeoFeatureModelSerializer):
@@ -234,7 +178,7 @@ class PanelCoordinatesSerializer(GeoFeatureModelSerializer):
         return obj.title[0]
 
     def get_number_of_inscriptions(self, obj):
-        return obj.inscriptions.count()
+        return _panel_inscription_count(obj)
         
 
 class KorniienkoImageSerializer(DynamicDepthSerializer):
@@ -259,70 +203,57 @@ class InscriptionSerializer(DynamicDepthSerializer):
     PRESERVE_BREAKS_FIELDS = ['transcription', 'interpretative_edition', 'translation_eng', 'translation_ukr']
     class Meta:
         model = Inscription
-        fields = get_fields(Inscription, exclude=DEFAULT_FIELDS)+ ['id', 'inscription_iiif_url', 'korniienko_image', 'width', 'height']
+        fields = get_fields(Inscription, exclude=DEFAULT_FIELDS + Inscription.DERIVED_FIELDS)+ ['id', 'inscription_iiif_url', 'korniienko_image', 'width', 'height']
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
         for field in self.RICH_TEXT_FIELDS:
             if field in data and data[field]:
-                data[field] = _clean_rich_text(
-                    data[field],
+                data[field] = cleaned_rich_text(
+                    instance, field,
                     preserve_tags=field in self.PRESERVE_BREAKS_FIELDS,
                 )
         return data
 
+    def get_orthophoto(self, obj):
+        """The panel's first orthophoto, read from the list prefetched by the viewsets
+        into ``panel.orthophotos`` and otherwise loaded once and kept there."""
+        panel = obj.panel
+        if panel is None:
+            return None
+        if not hasattr(panel, 'orthophotos'):
+            panel.orthophotos = list(panel.images.filter(type_of_image=1).order_by('pk')) # 1 is orthophotos
+        return panel.orthophotos[0] if panel.orthophotos else None
+
     def get_inscription_iiif_url(self, obj):
-        images = obj.panel.images.filter(type_of_image=1).values() # 1 is orthophotos
+        image = self.get_orthophoto(obj)
         
         url = ""
-        if len(images) > 0:
-            url = f"https://img.dh.gu.se/saintsophia/static/{images[0]['iiif_file']}/{obj.position_on_surface}/"
+        if image is not None:
+            url = f"https://img.dh.gu.se/saintsophia/static/{image.iiif_file.name}/{obj.position_on_surface}/"
         
         return url
     
+    def get_pct_size(self, obj, field, base):
+        """Scale the stored pct *field* of the IIIF pct:x,y,width,height region by *base* pixels"""
+        pct = getattr(obj, field)
+        if pct is None and obj.position_on_surface:
+            # row saved before the numeric columns existed
+            position = parse_position_on_surface(obj.position_on_surface)
+            pct = position[Inscription.POSITION_FIELDS.index(field)] if position else None
+        if not base or pct is None:
+            return None
+        return int(base * (pct / 100))
+
     def get_width(self, obj):
         """Calculate inscription width in pixels from IIIF pct region: width = baseWidth * (pctWidth / 100)"""
-        images = obj.panel.images.filter(type_of_image=1)
-        if not images.exists() or not obj.position_on_surface:
-            return None
-            
-        image = images.first()
-        if not image.width:
-            return None
-            
-        try:
-            # Parse pct:x,y,width,height format from position_on_surface
-            if obj.position_on_surface.startswith('pct:'):
-                pct_str = obj.position_on_surface.replace('pct:', '')
-                pct_values = pct_str.split(',')
-                if len(pct_values) == 4:
-                    pct_width = float(pct_values[2])
-                    return int(image.width * (pct_width / 100))
-        except:
-            pass
-        return None
+        image = self.get_orthophoto(obj)
+        return self.get_pct_size(obj, 'position_width', image.width if image else None)
     
     def get_height(self, obj):
         """Calculate inscription height in pixels from IIIF pct region: height = baseHeight * (pctHeight / 100)"""
-        images = obj.panel.images.filter(type_of_image=1)
-        if not images.exists() or not obj.position_on_surface:
-            return None
-            
-        image = images.first()
-        if not image.height:
-            return None
-            
-        try:
-            # Parse pct:x,y,width,height format from position_on_surface
-            if obj.position_on_surface.startswith('pct:'):
-                pct_str = obj.position_on_surface.replace('pct:', '')
-                pct_values = pct_str.split(',')
-                if len(pct_values) == 4:
-                    pct_height = float(pct_values[3])
-                    return int(image.height * (pct_height / 100))
-        except:
-            pass
-        return None
+        image = self.get_orthophoto(obj)
+        return self.get_pct_size(obj, 'position_height', image.height if image else None)
 
 
 class InscriptionTagsSerializer(DynamicDepthSerializer):
@@ -369,14 +300,14 @@ class SummarySerializer(DynamicDepthSerializer):
 
     class Meta:
         model = Inscription
-        fields = ['id']+get_fields(Inscription, exclude=['created_at', 'updated_at', 'inscription_iiif_url', 'korniienko_image'])
+        fields = ['id']+get_fields(Inscription, exclude=['created_at', 'updated_at', 'inscription_iiif_url', 'korniienko_image'] + Inscription.DERIVED_FIELDS)
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
         for field in self.RICH_TEXT_FIELDS:
             if field in data and data[field]:
-                data[field] = _clean_rich_text(
-                    data[field],
+                data[field] = cleaned_rich_text(
+                    instance, field,
                     preserve_breaks=field in self.PRESERVE_BREAKS_FIELDS,
                 )
         return data
@@ -1,32 +1,156 @@
-from django.db.models.signals import pre_save, post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
-from django.conf import settings
-from .models import  Image, Inscription
-import requests
+from .models import  Image, Inscription, Panel, HistoricalPerson, KorniienkoImage
+from . import models
+from .dimensions import dimension_queue
+from .facets import facet_index, invalidate_inscription_count
 
 @receiver(post_save, sender=Image)
 def fetch_image_dimensions(sender, instance, created, **kwargs):
-    """Fetch image dimensions from IIIF info.json after an Image is created."""
+    """Queue the fetching of image dimensions from IIIF info.json after an Image is created."""
     if created and instance.iiif_file:
-        # Construct IIIF URL from iiif_file path
-        iiif_url = f"{settings.IIIF_URL}{instance.iiif_file.name}"
-        info_json_url = f"{iiif_url}/info.json"
-        
-        try:
-            response = requests.get(info_json_url, timeout=10)
-            response.raise_for_status()
-            info_data = response.json()
-            width = info_data.get('width')
-            height = info_data.get('height')
-            print(f"Fetched dimensions for Image {instance.id}: width={width}, height={height}")
-            
-            if width and height:
-                instance.width = width
-                instance.height = height
-                instance.save(update_fields=['width', 'height'])
-                print(f"Updated Image {instance.id} with width {width} and height {height}")
-            else:
-                print(f"Width or height not found in info.json for Image {instance.id}")
-        except requests.RequestException as e:
-            print(f"Error fetching info.json for Image {instance.id} from {info_json_url}: {e}")
\ No newline at end of file
+        pk = instance.pk
+        transaction.on_commit(lambda: dimension_queue.enqueue([pk]))
+
+
+@receiver(post_save, sender=models.ImageType)
+def update_image_roles(sender, instance, created, **kwargs):
+    """Image roles are derived from the image type name."""
+    if not created:
+        images = list(instance.image_type.select_related('type_of_image'))
+        for image in images:
+            image.role = image.derive_role()
+        Image.objects.bulk_update(images, ['role'])
+
+
+# Autocomplete suggestions include values stored on related models, so they are
+# refreshed whenever one of those changes.
+
+def update_suggestions(inscriptions):
+    for inscription in inscriptions.select_related('panel').prefetch_related('mentioned_person', 'korniienko_image'):
+        inscription.update_suggestions()
+
+
+@receiver(post_save, sender=Panel)
+def update_panel_suggestions(sender, instance, created, **kwargs):
+    """Keep the 'Panel Title' suggestions in line with the surface title."""
+    if not created and instance.title_changed():
+        update_suggestions(instance.inscriptions.all())
+
+
+@receiver(post_save, sender=Panel)
+def update_panel_denominations(sender, instance, created, **kwargs):
+    """Inscription denominations start with the surface title."""
+    if not created and instance.title_changed():
+        instance.inscriptions.update(denomination=Inscription.denomination_expression())
+
+
+@receiver(post_save, sender=HistoricalPerson)
+def update_person_suggestions(sender, instance, created, **kwargs):
+    """Keep the 'Mentioned Person' suggestions in line with the person's name."""
+    if not created:
+        update_suggestions(instance.people_mentioned.all())
+
+
+@receiver(pre_delete, sender=HistoricalPerson)
+def remember_person_inscriptions(sender, instance, **kwargs):
+    # the links are deleted without m2m_changed
+    instance._deleted_inscription_pks = set(instance.people_mentioned.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=HistoricalPerson)
+def update_deleted_person_suggestions(sender, instance, **kwargs):
+    """Drop the 'Mentioned Person' suggestions of a deleted person."""
+    update_suggestions(Inscription.objects.filter(pk__in=instance.__dict__.pop('_deleted_inscription_pks', set())))
+
+
+@receiver(post_save, sender=KorniienkoImage)
+@receiver(post_delete, sender=KorniienkoImage)
+def update_korniienko_image_suggestions(sender, instance, **kwargs):
+    """Keep the 'Korniienko Image Title' suggestions in line with the images."""
+    if instance.inscription_id is not None:
+        update_suggestions(Inscription.objects.filter(pk=instance.inscription_id))
+
+
+@receiver(m2m_changed, sender=Inscription.mentioned_person.through)
+def update_mentioned_person_suggestions(sender, instance, action, reverse, pk_set, **kwargs):
+    """Refresh suggestions when people are added to or removed from inscriptions."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.update_suggestions()
+        return
+
+    # instance is a HistoricalPerson; a clear does not report the affected inscriptions
+    if action == 'pre_clear':
+        instance._cleared_inscription_pks = set(instance.people_mentioned.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        update_suggestions(Inscription.objects.filter(pk__in=instance.__dict__.pop('_cleared_inscription_pks', set())))
+    elif action in ('post_add', 'post_remove'):
+        update_suggestions(Inscription.objects.filter(pk__in=pk_set))
+
+
+# The data widget facet index is updated once the change is committed, so that
+# other processes never rebuild from data that is not visible yet.
+
+def update_facet_index(pks):
+    pks = set(pks)
+    transaction.on_commit(lambda: facet_index.update(pks))
+
+
+@receiver(post_save, sender=Inscription)
+@receiver(post_delete, sender=Inscription)
+def update_inscription_facets(sender, instance, **kwargs):
+    update_facet_index([instance.pk])
+    if kwargs.get('created', True):
+        # created, or deleted (post_delete sends no 'created')
+        transaction.on_commit(invalidate_inscription_count)
+
+
+@receiver(post_save, sender=Panel)
+def update_panel_facets(sender, instance, created, **kwargs):
+    """Medium and material are read through the surface of each inscription."""
+    if not created:
+        update_facet_index(instance.inscriptions.values_list('pk', flat=True))
+
+
+def update_m2m_facets(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            update_facet_index([instance.pk])
+        return
+
+    # instance is the related object; a clear does not report the affected inscriptions
+    field = next(field for field in Inscription._meta.many_to_many if field.remote_field.through is sender)
+    if action == 'pre_clear':
+        instance._cleared_facet_pks = set(
+            Inscription.objects.filter(**{field.name: instance}).values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        update_facet_index(instance.__dict__.pop('_cleared_facet_pks', set()))
+    elif action in ('post_add', 'post_remove'):
+        update_facet_index(pk_set)
+
+
+for field_name in ('genre', 'tags', 'alignment', 'condition', 'mentioned_person'):
+    m2m_changed.connect(
+        update_m2m_facets,
+        sender=getattr(Inscription, field_name).through,
+        dispatch_uid=f'inscriptions_facets_{field_name}',
+    )
+
+
+@receiver(post_delete, sender=models.InscriptionType)
+@receiver(post_delete, sender=models.WritingSystem)
+@receiver(post_delete, sender=models.Genre)
+@receiver(post_delete, sender=models.Tag)
+@receiver(post_delete, sender=models.Language)
+@receiver(post_delete, sender=models.Medium)
+@receiver(post_delete, sender=models.Material)
+@receiver(post_delete, sender=models.GraffitiAlignment)
+@receiver(post_delete, sender=models.GraffitiCondition)
+@receiver(post_delete, sender=HistoricalPerson)
+def invalidate_facet_index(sender, instance, **kwargs):
+    """Deleting a value removes its links without m2m_changed; rebuild from scratch."""
+    transaction.on_commit(facet_index.invalidate)
@@ -0,0 +1,50 @@
+"""A small corpus shared by the tests of the filters, facets and summaries."""
+from types import SimpleNamespace
+from apps.inscriptions import models
+
+
+def create_corpus():
+    """Two surfaces and three inscriptions:
+
+    - a: surface A1, textual, Greek in Cyrillic script, genres prayer and
+      signature, tagged cross, dated 1100-1150
+    - b: surface A1, textual, genre prayer, dated 1200-1300
+    - c: surface B2, pictorial, tagged cross, undated
+    """
+    corpus = SimpleNamespace()
+    corpus.plaster = models.Medium.objects.create(text='Plaster')
+    corpus.fresco = models.Medium.objects.create(text='Fresco')
+    corpus.panel_a = models.Panel.objects.create(title='A1', medium=corpus.plaster)
+    corpus.panel_b = models.Panel.objects.create(title='B2', medium=corpus.fresco)
+
+    corpus.textual = models.InscriptionType.objects.create(text='Textual', text_ukr='Текстовий')
+    corpus.pictorial = models.InscriptionType.objects.create(text='Pictorial', text_ukr='Зображальний')
+    corpus.greek = models.Language.objects.create(text='Greek', text_ukr='Грецька')
+    corpus.cyrillic = models.WritingSystem.objects.create(text='Cyrillic', text_ukr='Кирилиця')
+    corpus.prayer = models.Genre.objects.create(text='Prayer', text_ukr='Молитва')
+    corpus.signature = models.Genre.objects.create(text='Signature', text_ukr='Підпис')
+    corpus.cross = models.Tag.objects.create(text='Cross', text_ukr='Хрест')
+
+    corpus.a = models.Inscription.objects.create(
+        panel=corpus.panel_a, type_of_inscription=corpus.textual, language=corpus.greek,
+        writing_system=corpus.cyrillic, min_year=1100, max_year=1150,
+    )
+    corpus.a.genre.add(corpus.prayer, corpus.signature)
+    corpus.a.tags.add(corpus.cross)
+
+    corpus.b = models.Inscription.objects.create(
+        panel=corpus.panel_a, type_of_inscription=corpus.textual, min_year=1200, max_year=1300,
+    )
+    corpus.b.genre.add(corpus.prayer)
+
+    corpus.c = models.Inscription.objects.create(panel=corpus.panel_b, type_of_inscription=corpus.pictorial)
+    corpus.c.tags.add(corpus.cross)
+    return corpus
+
+
+def response_ids(response):
+    """Ids of the objects of a (paginated or not) list response."""
+    data = response.data
+    if isinstance(data, dict):
+        data = data['results']
+    return [row['id'] for row in data]
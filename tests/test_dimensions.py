@@ -0,0 +1,127 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.test import TestCase, TransactionTestCase
+from apps.inscriptions import models
+from apps.inscriptions.dimensions import DimensionFetcher, DimensionQueue, iiif_session
+
+
+class StandInIIIFServer:
+    """Local IIIF server answering info.json requests from a table of responses.
+
+    ``responses`` maps a path to the list of (status, body) answers returned
+    in turn, the last one repeated; other paths are 404.
+    """
+
+    def __init__(self):
+        self.responses = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                answers = server.responses.get(self.path, [(404, {})])
+                status, body = answers.pop(0) if len(answers) > 1 else answers[0]
+                content = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_address[1]}/'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def create_images(*iiif_files):
+    # bulk_create sends no post_save, so nothing is queued for the configured IIIF server
+    return models.Image.objects.bulk_create([models.Image(file=name, iiif_file=name) for name in iiif_files])
+
+
+def fetcher(base_url, retries=2):
+    return DimensionFetcher(base_url=base_url, timeout=2, session=iiif_session(retries=retries, backoff_factor=0))
+
+
+class DimensionFetcherTests(TestCase):
+
+    def setUp(self):
+        self.server = StandInIIIFServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+
+    def dimensions(self, image):
+        return tuple(models.Image.objects.filter(pk=image.pk).values_list('width', 'height').get())
+
+    def test_dimensions_are_stored(self):
+        first, second = create_images('panels/a.tif', 'panels/b.tif')
+        self.server.responses['/panels/a.tif/info.json'] = [(200, {'width': 4000, 'height': 3000})]
+        self.server.responses['/panels/b.tif/info.json'] = [(200, {'width': 800, 'height': 600})]
+
+        stored = fetcher(self.server.base_url).update([first.pk, second.pk])
+
+        self.assertEqual(stored, 2)
+        self.assertEqual(self.dimensions(first), (4000, 3000))
+        self.assertEqual(self.dimensions(second), (800, 600))
+
+    def test_server_errors_are_retried(self):
+        image, = create_images('panels/a.tif')
+        self.server.responses['/panels/a.tif/info.json'] = [(503, {}), (503, {}), (200, {'width': 4000, 'height': 3000})]
+
+        self.assertEqual(fetcher(self.server.base_url, retries=2).update([image.pk]), 1)
+        self.assertEqual(self.dimensions(image), (4000, 3000))
+        self.assertEqual(self.server.requests.count('/panels/a.tif/info.json'), 3)
+
+    def test_failures_leave_the_image_untouched(self):
+        missing, failing, incomplete = create_images('panels/missing.tif', 'panels/failing.tif', 'panels/incomplete.tif')
+        self.server.responses['/panels/failing.tif/info.json'] = [(500, {})]
+        self.server.responses['/panels/incomplete.tif/info.json'] = [(200, {'width': 4000})]
+
+        with self.assertLogs('apps.inscriptions.dimensions', 'WARNING') as logs:
+            stored = fetcher(self.server.base_url, retries=1).update([missing.pk, failing.pk, incomplete.pk])
+
+        self.assertEqual(stored, 0)
+        for image in (missing, failing, incomplete):
+            self.assertEqual(self.dimensions(image), (None, None))
+        self.assertEqual(len([line for line in logs.output if 'WARNING' in line]), 3)
+
+    def test_unreachable_server_leaves_the_image_untouched(self):
+        image, = create_images('panels/a.tif')
+        base_url = self.server.base_url
+        # nothing listens on the port any more
+        self.server.__exit__()
+
+        with self.assertLogs('apps.inscriptions.dimensions', 'WARNING'):
+            self.assertEqual(fetcher(base_url, retries=0).update([image.pk]), 0)
+        self.assertEqual(self.dimensions(image), (None, None))
+
+
+class DimensionQueueTests(TransactionTestCase):
+    # the worker thread has its own database connection, so the images must be committed
+
+    def test_queued_images_are_fetched_in_the_background(self):
+        images = create_images('panels/a.tif', 'panels/b.tif', 'panels/c.tif')
+        with StandInIIIFServer() as server:
+            for image in images:
+                server.responses[f'/{image.iiif_file}/info.json'] = [(200, {'width': 100 + image.pk, 'height': 50})]
+
+            dimension_queue = DimensionQueue(fetcher(server.base_url), batch_size=2, batch_wait=0.1)
+            dimension_queue.enqueue([image.pk for image in images])
+            dimension_queue.join()
+
+        self.assertEqual(
+            dict(models.Image.objects.values_list('pk', 'width')),
+            {image.pk: 100 + image.pk for image in images},
+        )
+        self.assertEqual(len(server.requests), 3)
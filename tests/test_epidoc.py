@@ -0,0 +1,67 @@
+import io
+import zipfile
+from datetime import datetime, timezone
+from django.test import SimpleTestCase
+from lxml import etree
+from apps.inscriptions.epidoc import TEI_NS, XML_NS, iter_tei_corpus, iter_tei_zip
+
+NS = {'tei': TEI_NS}
+
+
+def record(pk, **values):
+    return {
+        'id': pk, 'title': None, 'denomination': f'A1:{pk}', 'panel__title': 'A1', 'panel__room': None,
+        'language__text': None, 'min_year': None, 'max_year': None,
+        'updated_at': datetime(2024, 5, 1, tzinfo=timezone.utc), 'bibliography': [],
+        'epidoc_text': None, 'epidoc_interpretation': None,
+        **values,
+    }
+
+
+class TEIWriterTests(SimpleTestCase):
+
+    def corpus(self, records):
+        chunks = list(iter_tei_corpus(records))
+        return chunks, etree.fromstring(b''.join(chunks))
+
+    def test_corpus_of_documents(self):
+        chunks, root = self.corpus([
+            record(1, epidoc_text='<ab xmlns="http://www.tei-c.org/ns/1.0"><w>раба</w></ab>'),
+            record(2, min_year=1100, max_year=1150, bibliography=['Vysotskyi 1966']),
+        ])
+        self.assertEqual(root.tag, f'{{{TEI_NS}}}teiCorpus')
+        documents = root.findall('tei:TEI', NS)
+        self.assertEqual([document.get(f'{{{XML_NS}}}id') for document in documents], ['inscription-1', 'inscription-2'])
+        # one chunk for the corpus header, one per document, one for the end
+        self.assertEqual(len(chunks), 4)
+
+        edition = documents[0].find('.//tei:div[@type="edition"]', NS)
+        self.assertEqual(edition.get('subtype'), 'transcription')
+        self.assertEqual(edition.findtext('.//tei:w', namespaces=NS), 'раба')
+
+        self.assertEqual(documents[1].find('.//tei:origDate', NS).attrib, {'notBefore': '1100', 'notAfter': '1150'})
+        self.assertEqual(documents[1].findtext('.//tei:listBibl/tei:bibl', namespaces=NS), 'Vysotskyi 1966')
+
+    def test_body_of_a_complete_document_is_kept(self):
+        epidoc = ('<TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body>'
+                  '<div type="edition"><ab>text</ab></div></body></text></TEI>')
+        _, root = self.corpus([record(1, epidoc_interpretation=epidoc)])
+        edition = root.find('.//tei:div[@subtype="interpretation"]', NS)
+        self.assertEqual([etree.QName(child).localname for child in edition], ['div'])
+        self.assertEqual(edition.findtext('.//tei:ab', namespaces=NS), 'text')
+
+    def test_malformed_epidoc_is_left_out(self):
+        _, root = self.corpus([record(1, epidoc_text='<ab>unclosed')])
+        self.assertIsNone(root.find('.//tei:div[@type="edition"]', NS))
+
+    def test_empty_corpus(self):
+        _, root = self.corpus([])
+        self.assertEqual(root.findall('tei:TEI', NS), [])
+
+    def test_zip_of_documents(self):
+        data = b''.join(iter_tei_zip([record(1), record(2, title='Prayer')]))
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertEqual(archive.namelist(), ['inscription-1.xml', 'inscription-2.xml'])
+            root = etree.fromstring(archive.read('inscription-2.xml'))
+        self.assertEqual(root.tag, f'{{{TEI_NS}}}TEI')
+        self.assertEqual(root.findtext('.//tei:titleStmt/tei:title', namespaces=NS), 'Inscription A1:2 (Prayer)')
@@ -0,0 +1,138 @@
+import json
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from apps.inscriptions import facets, views
+from apps.inscriptions.facets import FacetIndex, bitmap_count, bitmap_from_ids
+from .fixtures import create_corpus
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+SHARED_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379'}}
+
+
+class BitmapTests(SimpleTestCase):
+
+    def test_bitmap_from_ids(self):
+        self.assertEqual(bitmap_from_ids([]), 0)
+        self.assertEqual(bitmap_from_ids([0, 3, 9]), 0b1000001001)
+        self.assertEqual(bitmap_count(bitmap_from_ids([1, 2, 2, 700])), 3)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class FacetIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.corpus = create_corpus()
+
+    def setUp(self):
+        cache.clear()
+        self.index = FacetIndex()
+
+    def count(self, **params):
+        return self.index.count(self.index.filter({key: str(value) for key, value in params.items()}))
+
+    def test_counts(self):
+        corpus = self.corpus
+        self.assertEqual(self.index.count(), 3)
+        self.assertEqual(self.count(genre=corpus.prayer.pk), 2)
+        self.assertEqual(self.count(genre=corpus.prayer.pk, tags=corpus.cross.pk), 1)
+        self.assertEqual(self.count(medium=corpus.plaster.pk), 2)
+        self.assertEqual(self.index.count(self.index.filter({}), type_of_inscription=corpus.pictorial.pk), 1)
+
+    def test_id_filter(self):
+        corpus = self.corpus
+        self.assertEqual(self.count(id=corpus.b.pk), 1)
+        self.assertEqual(self.count(id=corpus.b.pk, genre=corpus.signature.pk), 0)
+
+    def test_id_filter_out_of_range(self):
+        self.assertEqual(self.count(id=10 ** 12), 0)
+        self.assertEqual(self.count(id=-1), 0)
+        self.assertEqual(self.count(id='not-a-number'), 0)
+
+    def test_update(self):
+        corpus = self.corpus
+        self.assertEqual(self.count(tags=corpus.cross.pk), 2)
+        version = self.index.version
+
+        corpus.b.tags.add(corpus.cross)
+        self.index.update([corpus.b.pk])
+        self.assertEqual(self.count(tags=corpus.cross.pk), 3)
+        self.assertNotEqual(self.index.version, version)
+
+        pk = corpus.c.pk
+        corpus.c.delete()
+        self.index.update([pk])
+        self.assertEqual(self.index.count(), 2)
+        self.assertEqual(self.count(tags=corpus.cross.pk), 2)
+
+    def test_update_after_another_process_published(self):
+        corpus = self.corpus
+        self.assertEqual(self.count(genre=corpus.signature.pk), 1)
+        corpus.b.genre.add(corpus.signature)
+        # another process indexed the change to b and published a new version
+        FacetIndex().invalidate()
+        corpus.c.tags.remove(corpus.cross)
+        self.index.update([corpus.c.pk])
+        self.assertEqual(self.count(genre=corpus.signature.pk), 2)
+        self.assertEqual(self.count(tags=corpus.cross.pk), 1)
+
+    def test_rebuilt_when_another_process_publishes(self):
+        corpus = self.corpus
+        self.assertEqual(self.count(genre=corpus.signature.pk), 1)
+        corpus.b.genre.add(corpus.signature)
+        # another process updated its index and published a new version
+        FacetIndex().invalidate()
+        self.assertEqual(self.count(genre=corpus.signature.pk), 2)
+
+
+class DataWidgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.corpus = create_corpus()
+
+    def setUp(self):
+        cache.clear()
+        facets.facet_index.invalidate()
+        self.factory = APIRequestFactory()
+
+    def counts(self, params):
+        response = views.DataWidgetViewSet.as_view({'get': 'list'})(self.factory.get('/', params))
+        return json.loads(response.content)
+
+    def test_index_and_database_agree(self):
+        corpus = self.corpus
+        for params in ({}, {'genre': corpus.prayer.pk}, {'tags': corpus.cross.pk, 'panel': corpus.panel_b.pk},
+                       {'panel_title_str': 'A'}):
+            with self.subTest(params=params):
+                with override_settings(INSCRIPTIONS_FACET_INDEX=True):
+                    indexed = self.counts(params)
+                with override_settings(INSCRIPTIONS_FACET_INDEX=False):
+                    database = self.counts(params)
+                self.assertEqual(indexed, database)
+
+    def test_counts(self):
+        corpus = self.corpus
+        with override_settings(INSCRIPTIONS_FACET_INDEX=False):
+            counts = self.counts({'genre': corpus.prayer.pk})
+        self.assertEqual(counts['all_inscriptions'], 3)
+        self.assertEqual(counts['shown_inscriptions'], 2)
+        self.assertEqual(counts['hidden_inscriptions'], 1)
+
+
+class FacetIndexCacheCheckTests(SimpleTestCase):
+
+    @override_settings(CACHES=LOCAL_CACHE, INSCRIPTIONS_FACET_INDEX=True)
+    def test_per_process_cache_is_an_error(self):
+        self.assertEqual([error.id for error in facets.check_facet_index_cache(None)], ['inscriptions.E001'])
+
+    @override_settings(CACHES=SHARED_CACHE, INSCRIPTIONS_FACET_INDEX=True)
+    def test_shared_cache(self):
+        self.assertEqual(facets.check_facet_index_cache(None), [])
+        self.assertTrue(facets.facet_index_enabled())
+
+    @override_settings(CACHES=LOCAL_CACHE, INSCRIPTIONS_FACET_INDEX=False)
+    def test_disabled_index(self):
+        self.assertEqual(facets.check_facet_index_cache(None), [])
+        self.assertFalse(facets.facet_index_enabled())
@@ -0,0 +1,73 @@
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from apps.inscriptions import models, views
+from .fixtures import create_corpus, response_ids
+
+
+class InscriptionFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.corpus = create_corpus()
+
+    def filtered(self, params):
+        return set(views.InscriptionFilter(params, queryset=models.Inscription.objects.all()).qs.values_list('pk', flat=True))
+
+    def test_missing_m2m_parameters_do_not_filter(self):
+        corpus = self.corpus
+        self.assertEqual(self.filtered({}), {corpus.a.pk, corpus.b.pk, corpus.c.pk})
+
+    def test_m2m_filter(self):
+        corpus = self.corpus
+        self.assertEqual(self.filtered({'genre': [corpus.signature.pk]}), {corpus.a.pk})
+        self.assertEqual(self.filtered({'tags': [corpus.cross.pk]}), {corpus.a.pk, corpus.c.pk})
+
+    def test_m2m_filter_with_several_values_has_no_duplicates(self):
+        corpus = self.corpus
+        inscriptions = views.InscriptionFilter(
+            {'genre': [corpus.prayer.pk, corpus.signature.pk]}, queryset=models.Inscription.objects.all()
+        ).qs
+        self.assertEqual(sorted(inscriptions.values_list('pk', flat=True)), [corpus.a.pk, corpus.b.pk])
+
+    def test_m2m_filters_are_combined(self):
+        corpus = self.corpus
+        self.assertEqual(self.filtered({'genre': [corpus.prayer.pk], 'tags': [corpus.cross.pk]}), {corpus.a.pk})
+
+    def test_filter_on_surface_medium(self):
+        corpus = self.corpus
+        self.assertEqual(self.filtered({'medium': corpus.fresco.pk}), {corpus.c.pk})
+
+
+class InscriptionEndpointTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.corpus = create_corpus()
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def get(self, viewset, params=None):
+        return viewset.as_view({'get': 'list'})(self.factory.get('/', params or {}))
+
+    def test_list_without_parameters(self):
+        corpus = self.corpus
+        response = self.get(views.InscriptionViewSet)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response_ids(response), [corpus.a.pk, corpus.b.pk, corpus.c.pk])
+
+    def test_list_filtered_on_genre(self):
+        corpus = self.corpus
+        response = self.get(views.InscriptionViewSet, {'genre': corpus.prayer.pk})
+        self.assertEqual(response_ids(response), [corpus.a.pk, corpus.b.pk])
+
+    def test_stream_without_parameters(self):
+        response = self.get(views.InscriptionStreamViewSet)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_stream_filtered_on_tag(self):
+        corpus = self.corpus
+        response = self.get(views.InscriptionStreamViewSet, {'tags': corpus.cross.pk})
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 2)
@@ -0,0 +1,32 @@
+from django.test import SimpleTestCase
+from apps.inscriptions.imports import clean_row
+
+
+class CleanRowTests(SimpleTestCase):
+
+    def test_valid_row(self):
+        values, m2m, errors = clean_row({
+            'title': 'Prayer', 'min_year': '1100', 'position_on_surface': 'pct:9.27,61.42,4.70,2.45',
+            'panel': '3', 'genre': '1;2', 'epidoc_text': '<ab>text</ab>',
+        })
+        self.assertEqual(errors, [])
+        self.assertEqual(values['min_year'], 1100)
+        self.assertEqual(values['panel_id'], 3)
+        self.assertEqual(m2m['genre'], [1, 2])
+
+    def test_empty_cells_are_null(self):
+        values, m2m, errors = clean_row({'title': '', 'min_year': '', 'panel': ''})
+        self.assertEqual(errors, [])
+        self.assertEqual(values, {'title': None, 'min_year': None, 'panel_id': None})
+
+    def test_field_errors(self):
+        values, m2m, errors = clean_row({'min_year': 'eleventh', 'epidoc_text': '<ab>unclosed', 'genre': 'prayer'})
+        self.assertEqual(sorted({field for field, message in errors}), ['epidoc_text', 'genre', 'min_year'])
+
+    def test_model_clean_is_applied(self):
+        values, m2m, errors = clean_row({'position_on_surface': 'xywh=1,2,3,4'})
+        self.assertEqual(len(errors), 1)
+
+    def test_model_clean_waits_for_valid_fields(self):
+        values, m2m, errors = clean_row({'position_on_surface': 'xywh=1,2,3,4', 'min_year': 'eleventh'})
+        self.assertEqual([field for field, message in errors], ['min_year'])
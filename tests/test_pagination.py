@@ -0,0 +1,54 @@
+from urllib.parse import parse_qs, urlparse
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from apps.inscriptions import models, views
+from .fixtures import create_corpus, response_ids
+
+
+class CursorPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.corpus = create_corpus()
+        for _ in range(4):
+            models.Inscription.objects.create(panel=cls.corpus.panel_b)
+
+    def get(self, params):
+        return views.InscriptionViewSet.as_view({'get': 'list'})(APIRequestFactory().get('/', params))
+
+    def pages(self, params):
+        """Ids of every page, following the next links."""
+        pages = []
+        while params is not None:
+            response = self.get(params)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response_ids(response))
+            next_link = response.data['next']
+            params = {key: values[0] for key, values in parse_qs(urlparse(next_link).query).items()} if next_link else None
+        return pages
+
+    def test_pages_cover_every_inscription_once(self):
+        pages = self.pages({'pagination': 'cursor', 'page_size': 3})
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        ids = [pk for page in pages for pk in page]
+        self.assertEqual(ids, sorted(models.Inscription.objects.values_list('pk', flat=True)))
+
+    def test_no_row_skipped_when_rows_are_added(self):
+        first = self.get({'pagination': 'cursor', 'page_size': 3})
+        added = models.Inscription.objects.create(panel=self.corpus.panel_a)
+        params = {key: values[0] for key, values in parse_qs(urlparse(first.data['next']).query).items()}
+        ids = response_ids(first) + [pk for page in self.pages(params) for pk in page]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(ids[-1], added.pk)
+        self.assertEqual(len(ids), models.Inscription.objects.count())
+
+    def test_filters_apply_to_cursor_pages(self):
+        corpus = self.corpus
+        pages = self.pages({'pagination': 'cursor', 'page_size': 1, 'genre': corpus.prayer.pk})
+        self.assertEqual(pages, [[corpus.a.pk], [corpus.b.pk]])
+
+    def test_default_pagination_without_cursor(self):
+        response = self.get({})
+        self.assertEqual(response.status_code, 200)
+        if isinstance(response.data, dict):
+            self.assertNotIn('cursor=', response.data.get('next') or '')
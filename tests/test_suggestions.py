@@ -0,0 +1,39 @@
+from unittest import mock
+from django.test import TestCase
+from apps.inscriptions import models
+
+
+class SuggestionTests(TestCase):
+
+    def setUp(self):
+        self.panel = models.Panel.objects.create(title='A1')
+        self.person = models.HistoricalPerson.objects.create(name='Yaroslav')
+        self.inscription = models.Inscription.objects.create(panel=self.panel)
+        self.inscription.mentioned_person.add(self.person)
+
+    def values(self, source):
+        return list(self.inscription.suggestions.filter(source=source).values_list('value', flat=True))
+
+    def test_mentioned_person_suggestions(self):
+        self.assertEqual(self.values('Mentioned Person'), ['Yaroslav'])
+        self.person.name = 'Yaroslav the Wise'
+        self.person.save()
+        self.assertEqual(self.values('Mentioned Person'), ['Yaroslav the Wise'])
+
+    def test_deleted_person_suggestions_are_dropped(self):
+        self.person.delete()
+        self.assertEqual(self.values('Mentioned Person'), [])
+
+    def test_panel_title_change(self):
+        panel = models.Panel.objects.get(pk=self.panel.pk)
+        panel.title = 'B2'
+        panel.save()
+        self.assertEqual(self.values('Panel Title'), ['B2'])
+        self.assertEqual(models.Inscription.objects.get(pk=self.inscription.pk).denomination, f'B2:{self.inscription.pk}')
+
+    def test_panel_save_without_title_change_keeps_suggestions(self):
+        panel = models.Panel.objects.get(pk=self.panel.pk)
+        panel.room = 'Nave'
+        with mock.patch.object(models.Inscription, 'update_suggestions') as update_suggestions:
+            panel.save()
+        update_suggestions.assert_not_called()
@@ -0,0 +1,60 @@
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from apps.inscriptions import views
+from .fixtures import create_corpus
+
+
+def counts(entries, key):
+    return {entry[key]: entry['count'] for entry in entries}
+
+
+class SummaryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.corpus = create_corpus()
+
+    def summary(self, params=None):
+        response = views.SummaryViewSet.as_view({'get': 'list'})(APIRequestFactory().get('/', params or {}))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_summary_of_all_inscriptions(self):
+        summary = self.summary()
+        self.assertEqual(counts(summary['type_of_inscription'], 'type'), {'Textual': 2, 'Pictorial': 1})
+        self.assertEqual(counts(summary['language'], 'language'), {'Greek': 1})
+        self.assertEqual(counts(summary['writing_system'], 'writing_system'), {'Cyrillic': 1})
+        self.assertEqual(counts(summary['textual_genre'], 'textual_genre'), {'Prayer': 2, 'Signature': 1})
+        self.assertEqual(counts(summary['pictorial_description'], 'pictorial_description'), {'Cross': 2})
+        self.assertEqual(counts(summary['min_year'], 'min_year'), {1100: 1, 1200: 1})
+        self.assertEqual(counts(summary['max_year'], 'max_year'), {1150: 1, 1300: 1})
+        self.assertEqual(summary['avg_year'], [{'avg_year': 1125, 'count': 1}, {'avg_year': 1250, 'count': 1}])
+
+    def test_ukrainian_labels(self):
+        summary = self.summary()
+        labels = {entry['type']: entry['type_ukr'] for entry in summary['type_of_inscription']}
+        self.assertEqual(labels, {'Textual': 'Текстовий', 'Pictorial': 'Зображальний'})
+
+    def test_facets_sorted_by_count(self):
+        summary = self.summary()
+        self.assertEqual(summary['textual_genre'][0]['textual_genre'], 'Prayer')
+        self.assertEqual(summary['type_of_inscription'][0]['type'], 'Textual')
+
+    def test_filtered_summary(self):
+        corpus = self.corpus
+        summary = self.summary({'genre': corpus.signature.pk})
+        self.assertEqual(counts(summary['type_of_inscription'], 'type'), {'Textual': 1})
+        # the other genres of the matching inscriptions are counted too
+        self.assertEqual(counts(summary['textual_genre'], 'textual_genre'), {'Prayer': 1, 'Signature': 1})
+        self.assertEqual(counts(summary['min_year'], 'min_year'), {1100: 1})
+
+    def test_undated_inscriptions_are_left_out_of_the_dating(self):
+        corpus = self.corpus
+        summary = self.summary({'panel': corpus.panel_b.pk})
+        self.assertEqual(counts(summary['type_of_inscription'], 'type'), {'Pictorial': 1})
+        self.assertEqual(summary['min_year'], [])
+        self.assertEqual(summary['avg_year'], [])
+
+    def test_empty_summary(self):
+        summary = self.summary({'id': 0})
+        self.assertTrue(all(entries == [] for entries in summary.values()))
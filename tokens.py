@@ -0,0 +1,54 @@
+"""Word tokens of EpiDoc editions, read from their ``<w>`` elements.
+
+Tokens are stored in the EpiDocToken table when an inscription is saved (see
+Inscription.update_epidoc_tokens) so that word-level queries run against an
+index rather than over the XML. Only words tagged with ``<w>`` are indexed.
+Elements are matched by local name, so documents with and without the TEI
+namespace are read alike.
+"""
+from lxml import etree
+import unicodedata
+
+
+def _named(*names):
+    return ' or '.join(f"local-name()='{name}'" for name in names)
+
+
+WORDS = etree.XPath(f"//*[{_named('w')}]")
+# text of a word as read: editorial notes and the alternatives replaced in a
+# <choice> (abbreviation, original spelling, error) are left out
+WORD_TEXT = etree.XPath(
+    f".//text()[not(ancestor::*[{_named('note')} or (({_named('abbr', 'orig', 'sic')}) and parent::*[{_named('choice')}])])]"
+)
+IS_ABBREVIATED = etree.XPath(f"boolean(.//*[{_named('expan', 'ex')}] | ancestor::*[{_named('expan')}])")
+IS_UNCLEAR = etree.XPath(f"boolean(.//*[{_named('unclear')}] | ancestor::*[{_named('unclear')}])")
+IS_SUPPLIED = etree.XPath(f"boolean(.//*[{_named('supplied')}] | ancestor::*[{_named('supplied')}])")
+
+
+def normalize_token(value):
+    """Lowercase *value* and drop its diacritics (accents, breathings, titla),
+    the form tokens are matched on."""
+    decomposed = unicodedata.normalize('NFD', value.casefold())
+    return unicodedata.normalize('NFC', ''.join(char for char in decomposed if not unicodedata.combining(char)))
+
+
+def epidoc_tokens(root):
+    """Yield the tokens of a parsed EpiDoc document as dicts of EpiDocToken
+    field values, numbered from 0 in document order."""
+    if root is None:
+        return
+    position = 0
+    for word in WORDS(root):
+        form = ''.join(''.join(WORD_TEXT(word)).split())
+        if not form:
+            continue
+        yield {
+            'position': position,
+            'form': form,
+            'normalized': normalize_token(form),
+            'lemma': word.get('lemma', ''),
+            'abbreviated': IS_ABBREVIATED(word),
+            'unclear': IS_UNCLEAR(word),
+            'supplied': IS_SUPPLIED(word),
+        }
+        position += 1
@@ -24,6 +24,12 @@ router.register(rf'{endpoint}/korniienko-image', views.KorniienkoImageViewSet, b
 router.register(rf'{endpoint}/object-rti', views.ObjectRTIViewSet, basename='object RTI')
 router.register(rf'{endpoint}/object-mesh-3d', views.ObjectMesh3DViewSet, basename='object Mesh 3D')
 router.register(rf'{endpoint}/inscription', views.InscriptionViewSet, basename='inscription')
+# the whole (filtered) corpus as newline-delimited JSON
+router.register(rf'{endpoint}/inscription-stream', views.InscriptionStreamViewSet, basename='inscription stream')
+# EpiDoc editions as a TEI corpus or a zip of TEI documents
+router.register(rf'{endpoint}/epidoc', views.EpiDocViewSet, basename='epidoc export')
+# keyword in context search of the words of the EpiDoc editions
+router.register(rf'{endpoint}/epidoc-concordance', views.EpiDocConcordanceViewSet, basename='epidoc concordance')
 
 # new search view for inscriptions
 router.register(rf'{endpoint}/search', views.SearchInscriptionViewSet, basename= 'search inscriptions')
@@ -32,8 +38,13 @@ router.register(rf'{endpoint}/autocomplete', views.AutoCompleteInscriptionViewSe
 # view for inscriptions beginning by string for autocomplete, old version without autocomplete
 router.register(rf'{endpoint}/inscription-string', views.InscriptionStringViewSet, basename='inscriptions beginning by string')
 
+# previous and next ids for navigating between surfaces and inscriptions
+router.register(rf'{endpoint}/panel-neighbors', views.PanelNeighborsViewSet, basename='panel neighbors')
+router.register(rf'{endpoint}/inscription-neighbors', views.InscriptionNeighborsViewSet, basename='inscription neighbors')
+
 router.register(rf'{endpoint}/inscription-contributors', views.ContributorsViewSet, basename='contributors to inscription')
 router.register(rf'{endpoint}/annotation', views.AnnotationViewSet, basename='annotations')
+router.register(rf'{endpoint}/annotation-page', views.AnnotationPageViewSet, basename='annotation page')
 router.register(rf'{endpoint}/inscription-tags', views.InscriptionTagsViewSet, basename="tags for inscriptions")
 router.register(rf'{endpoint}/tags-with-data', views.TagsWithDataViewSet, basename="tags with data attached")
 router.register(rf'{endpoint}/genre-with-data', views.GenreDataViewSet, basename="genre with data attached")
@@ -56,9 +67,11 @@ urlpatterns = [
 
     # Automatically generated views
     *utils.get_model_urls('inscriptions', endpoint, 
-        exclude=['panel', 'image','inscription', 'translation', 'objectrti', 'objectmesh3d', 'language', 'writingsystem', 'tag', 'historicalperson']),
+        exclude=['panel', 'image','inscription', 'translation', 'objectrti', 'objectmesh3d', 'language', 'writingsystem', 'tag', 'historicalperson',
+                 'inscriptionsuggestion', 'epidoctoken']),
 
     *utils.get_model_urls('inscriptions', f'{endpoint}', exclude=['panel', 'image', 'inscription', 'translation', 'objectrti', 'objectmesh3d',  
-                                                                  'language', 'writingsystem', 'tag', 'historicalperson']),
+                                                                  'language', 'writingsystem', 'tag', 'historicalperson',
+                                                                  'inscriptionsuggestion', 'epidoctoken']),
     *documentation
 ]
@@ -1,76 +1,143 @@
 from unittest.mock import DEFAULT
 from . import models, serializers
-from django.db.models import Q, Value, Case, When, Count, F, IntegerField, Func, TextField
-from django.db.models.functions import Cast
+from .annotations import (
+    annotation_inscriptions, annotation_page_cache_key, annotation_page_chunks, annotation_page_id, annotation_rows,
+    build_annotation,
+)
+from .epidoc import epidoc_inscriptions, iter_tei_corpus, iter_tei_zip, tei_records
+from .exports import inscription_records, json_line
+from .facets import bitmap_from_ids, facet_index, facet_index_enabled, inscription_count
+from .pagination import OptInCursorPaginationMixin
+from .tokens import normalize_token
+from django.db.models import Q, Value, Case, When, Count, IntegerField, Max, Min, Exists, OuterRef, Prefetch, Subquery
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.search import SearchQuery, TrigramSimilarity
 from saintsophia.abstract.views import DynamicDepthViewSet, GeoViewSet
 from saintsophia.abstract.models import get_fields, DEFAULT_FIELDS
-from django.http import HttpResponse
-from django.utils.html import strip_tags
-import html as html_module
+from django.db import connections
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
 import json
+import re
+import unicodedata
 import django_filters
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 
 
-class StripHTML(Func):
-    """PostgreSQL function to strip HTML tags from a text field using REGEXP_REPLACE."""
-    function = 'REGEXP_REPLACE'
-    template = "%(function)s(COALESCE(%(expressions)s, ''), '<[^>]*>', '', 'g')"
-    output_field = TextField()
-
-
-# RichText fields on Inscription that are searched with free-text queries
-_RICH_TEXT_FIELDS = [
-    'transcription', 'interpretative_edition', 'romanisation',
-    'translation_eng', 'translation_ukr',
-]
+def _compile_lookup(lookup, value):
+    """Compile the filter ``lookup=value`` on Inscription.
 
+    Lookups that go through a many-to-many or reverse foreign key relation
+    become an EXISTS subquery on the through (or related) table instead of a
+    join, so the filtered queryset has one row per inscription and never
+    needs DISTINCT.
+    """
+    field_name, _, rest = lookup.partition('__')
+    field = models.Inscription._meta.get_field(field_name)
+    if field.many_to_many:
+        through = field.remote_field.through
+        target = field.m2m_reverse_field_name()
+        return Exists(through.objects.filter(**{
+            field.m2m_field_name(): OuterRef('pk'),
+            f'{target}__{rest}' if rest else target: value,
+        }))
+    if field.one_to_many:
+        return Exists(field.related_model.objects.filter(**{
+            field.field.name: OuterRef('pk'),
+            rest or 'pk': value,
+        }))
+    return Q(**{lookup: value})
+
+
+# Widget and summary query parameters, with the lookup each of them filters on
+_INSCRIPTION_FILTERS = {
+    'type_of_inscription': 'type_of_inscription__id__exact',
+    'writing_system': 'writing_system__id__exact',
+    'genre': 'genre__id__exact',
+    'tags': 'tags__id__exact',
+    'language': 'language__id__exact',
+    'panel': 'panel__id__exact',
+    'id': 'id',
+    'medium': 'panel__medium__id__exact',
+    'material': 'panel__material__exact',
+    'alignment': 'alignment__id__exact',
+    'condition': 'condition__id__exact',
+    'mentioned_person': 'mentioned_person__id__exact',
+    'panel_title_str': 'panel__title__startswith',
+    'inscription_title_str': 'title__startswith',
+}
+
+# Exact item selection parameters from autocomplete
+_SEARCH_SELECTION_FILTERS = {
+    'title': 'title__icontains',
+    'panel': 'panel__title__icontains',
+    'transcription': 'transcription_plain__icontains',
+    'interpretative_edition': 'interpretative_edition_plain__icontains',
+    'romanisation': 'romanisation_plain__icontains',
+    'translation_eng': 'translation_eng_plain__icontains',
+    'translation_ukr': 'translation_ukr_plain__icontains',
+    'mentioned_person_name': 'mentioned_person__name__icontains',
+    'korniienko_image_title': 'korniienko_image__title__icontains',
+}
+
+
+def _filter_inscriptions(queryset, params, filters=_INSCRIPTION_FILTERS):
+    """Apply the query parameters present in *params* through the lookups of *filters*."""
+    for param, lookup in filters.items():
+        value = params.get(param)
+        if value:
+            queryset = queryset.filter(_compile_lookup(lookup, value))
+    return queryset
+
+
+def _search_inscriptions(queryset, params):
+    """Apply the search parameters of the search widgets.
+
+    Two autocomplete modes:
+    1) q provided => partial text search across supported fields.
+    2) no q => exact field matching for selected autocomplete item(s).
+    """
+    q = (params.get('q') or '').strip()
+    if q:
+        return queryset.filter(_build_search_q(q))
+    return _filter_inscriptions(queryset, params, _SEARCH_SELECTION_FILTERS)
 
-def _annotate_clean_fields(queryset):
-    """Annotate the queryset with HTML-stripped versions of RichText fields."""
-    annotations = {f'clean_{f}': StripHTML(f) for f in _RICH_TEXT_FIELDS}
-    return queryset.annotate(**annotations)
 
+def _build_search_query(search_term):
+    """Build a prefix-matching full-text query from the words of *search_term*.
 
-def _to_html_entities(text):
-    """Convert a Unicode string to its HTML named-entity equivalent.
-    
-    CKEditor stores Greek / Cyrillic / other non-ASCII text as HTML named
-    entities (e.g. &delta;&omicron;&upsilon;...).  To let users search in
-    their native script we convert the search term to the same form so we
-    can match against the raw DB content as well.
+    Every word must match the beginning of a word in the inscription's
+    search vector, so partially typed words still find their inscriptions.
+    Returns None when the term contains no word characters.
     """
-    return ''.join(
-        f'&{html_module.entities.codepoint2name[ord(ch)]};'
-        if ord(ch) in html_module.entities.codepoint2name
-        else ch
-        for ch in text
-    )
+    words = re.findall(r'[^\W_]+', unicodedata.normalize('NFC', search_term))
+    if not words:
+        return None
+    raw_query = ' & '.join(f'{word}:*' for word in words)
+    return SearchQuery(raw_query, search_type='raw', config=models.SEARCH_CONFIG)
 
 
 def _build_search_q(search_term):
-    """Build a Q filter that searches plain-text fields normally and RichText
-    fields via both the Unicode search term AND its HTML-entity equivalent
-    so that Greek / Church Slavonic / etc. characters match the entity-encoded
-    content stored by CKEditor."""
-    entity_term = _to_html_entities(search_term)
+    """Build a Q filter that searches plain-text fields with ``icontains`` and
+    the RichText fields through the stored, GIN-indexed search vector.
 
-    # For plain-text fields just use the original term
+    The RichText fields are also matched as substrings of their plain-text
+    copies (served by the trigram indexes), so that fragments inside words of
+    damaged or continuous text are found, as autocomplete suggests them.
+    """
     q = (
         Q(title__icontains=search_term) |
         Q(panel__title__icontains=search_term) |
-        Q(mentioned_person__name__icontains=search_term) |
-        Q(korniienko_image__title__icontains=search_term)
+        Q(_compile_lookup('mentioned_person__name__icontains', search_term)) |
+        Q(_compile_lookup('korniienko_image__title__icontains', search_term))
     )
+    for field in models.Inscription.SEARCH_FIELDS:
+        q |= Q(**{f'{field}_plain__icontains': search_term})
 
-    # For RichText fields search both the Unicode term (against the
-    # tag-stripped annotation) AND the entity-encoded term (against the raw
-    # DB column) so we cover both storage styles.
-    for field in _RICH_TEXT_FIELDS:
-        q |= Q(**{f'clean_{field}__icontains': search_term})
-        if entity_term != search_term:
-            q |= Q(**{f'{field}__icontains': entity_term})
+    search_query = _build_search_query(search_term)
+    if search_query is not None:
+        q |= Q(search_vector=search_query)
 
     return q
 
@@ -129,34 +196,32 @@ class BibliographyItemViewSet(DynamicDepthViewSet):
     filterset_fields = get_fields(models.BibliographyItem, exclude=DEFAULT_FIELDS)
 
 
+def _scoped_inscriptions(params):
+    """Inscriptions limited by the optional ``id`` and ``surface`` (panel title contains) parameters."""
+    inscriptions = models.Inscription.objects.all()
+    inscription_id = params.get('id')
+    if inscription_id:
+        inscriptions = inscriptions.filter(id=inscription_id)
+    surface = params.get('surface')
+    if surface:
+        inscriptions = inscriptions.filter(panel__title__contains=surface)
+    return inscriptions.values('pk')
+
+
 class ContributorsViewSet(DynamicDepthViewSet):
     queryset = models.Inscription.objects.all()
     serializer_class = serializers.InscriptionSerializer
-    filterset_fields = get_fields(models.Inscription, exclude=DEFAULT_FIELDS)
+    filterset_fields = get_fields(models.Inscription, exclude=DEFAULT_FIELDS + models.Inscription.DERIVED_FIELDS)
     
     def list(self, request):
-        queryset = models.Inscription.objects.all().order_by('title')
-        
-        inscription_id = self.request.query_params.get('id')
-        if inscription_id:
-            inscriptions = queryset.filter(id=inscription_id)
-        else:
-            inscriptions = queryset
+        inscriptions = _scoped_inscriptions(self.request.query_params)
+        authors = models.Author.objects.filter(
+            Exists(models.Inscription.author.through.objects.filter(author_id=OuterRef('pk'), inscription__in=inscriptions))
+        ).values_list('id', 'lastname', 'firstname')
 
-        inscription_serializer = serializers.InscriptionSerializer(inscriptions, many=True)
-        
-        formatted_data = []
-        list_of_authors = []
-        
-        for inscription in inscription_serializer.data:    
-            inscriptions_authors = inscription.get('author')
-            for author_id in inscriptions_authors:
-                list_of_authors.append(models.Author.objects.get(id = author_id))
-            
-        list_of_authors = set(list_of_authors)
-        authors_names = [f"{author.lastname} {author.firstname}" for author in list_of_authors]
-        authors_names.sort()
-        authors_ids = [author.id for author in list_of_authors]
+        authors = sorted((f"{lastname} {firstname}", author_id) for author_id, lastname, firstname in authors)
+        authors_names = [name for name, author_id in authors]
+        authors_ids = [author_id for name, author_id in authors]
         
         formatted_data = [
             {
@@ -168,9 +233,22 @@ class ContributorsViewSet(DynamicDepthViewSet):
         return Response(formatted_data)
 
 
+def _annotate_panel_inscriptions(queryset):
+    """Annotate panels with the inscription count and language names read by the
+    panel serializers, so a list of panels is a single query."""
+    return queryset.annotate(
+        inscription_count=Count('inscriptions', distinct=True),
+        language_list=ArrayAgg(
+            'inscriptions__language__text',
+            distinct=True,
+            filter=Q(inscriptions__language__isnull=False),
+        ),
+    )
+
+
 class PanelViewSet(DynamicDepthViewSet):
     # this view is redundant and should be erased in a second time, unless specific fields need to be potrayed in here
-    queryset = models.Panel.objects.all().order_by('title')
+    queryset = _annotate_panel_inscriptions(models.Panel.objects.all()).order_by('title')
     serializer_class = serializers.PanelSerializer
     filterset_fields = get_fields(models.Panel, exclude=DEFAULT_FIELDS+['geometry', 'spatial_position', 'spatial_direction'])
 
@@ -184,7 +262,7 @@ class PanelGeoViewSet(GeoViewSet):
     
     
 class PanelMetadataViewSet(DynamicDepthViewSet):
-    queryset = models.Panel.objects.all().order_by('title')
+    queryset = _annotate_panel_inscriptions(models.Panel.objects.all()).order_by('title')
     serializer_class = serializers.PanelMetadataSerializer
     filterset_fields = get_fields(models.Panel, exclude=DEFAULT_FIELDS+['geometry', 'spatial_position', 'spatial_direction'])
 
@@ -209,11 +287,11 @@ class PanelCoordinatesViewSet(GeoViewSet):
         if floor: 
             queryset = queryset.filter(title__startswith=floor)
                 
-        return queryset
+        return queryset.annotate(inscription_count=Count('inscriptions'))
     
     
 class PanelInfoViewSet(DynamicDepthViewSet):
-    queryset = models.Panel.objects.all()  
+    queryset = _annotate_panel_inscriptions(models.Panel.objects.all())
     serializer_class = serializers.PanelMetadataSerializer
 
     def list(self, request):
@@ -243,7 +321,12 @@ class PanelStringViewSet(DynamicDepthViewSet):
         if str: 
             queryset = queryset.filter(title__startswith=str)
             
-        return queryset
+        return _annotate_panel_inscriptions(queryset)
+
+
+def _m2m_filter(model):
+    """Filter on a many-to-many field of Inscription accepting one or more ids."""
+    return django_filters.ModelMultipleChoiceFilter(queryset=model.objects.all(), method='filter_m2m')
 
 
 class InscriptionFilter(django_filters.FilterSet):
@@ -252,6 +335,22 @@ class InscriptionFilter(django_filters.FilterSet):
     material = django_filters.NumberFilter(field_name='panel__material__id', lookup_expr='exact')
     panel_title_str = django_filters.CharFilter(field_name='panel__title', lookup_expr='startswith')
     inscription_title_str = django_filters.CharFilter(field_name='title', lookup_expr='startswith')
+    # RichText fields are matched against their plain-text copies
+    transcription__icontains = django_filters.CharFilter(field_name='transcription_plain', lookup_expr='icontains')
+    interpretative_edition__icontains = django_filters.CharFilter(field_name='interpretative_edition_plain', lookup_expr='icontains')
+    romanisation__icontains = django_filters.CharFilter(field_name='romanisation_plain', lookup_expr='icontains')
+    # many-to-many relations are filtered through EXISTS subqueries, see _compile_lookup
+    genre = _m2m_filter(models.Genre)
+    tags = _m2m_filter(models.Tag)
+    dating_criteria = _m2m_filter(models.DatingCriterium)
+    mentioned_person = _m2m_filter(models.HistoricalPerson)
+    condition = _m2m_filter(models.GraffitiCondition)
+    alignment = _m2m_filter(models.GraffitiAlignment)
+    extra_alphabetical_sign = _m2m_filter(models.ExtraAlphabeticalSign)
+    author = _m2m_filter(models.Author)
+    # rectangles on the surface, as pct:x,y,w,h or an inscription id
+    region = django_filters.CharFilter(method='filter_region')
+    overlaps = django_filters.NumberFilter(method='filter_overlaps')
 
     class Meta:
         model = models.Inscription
@@ -263,8 +362,6 @@ class InscriptionFilter(django_filters.FilterSet):
             'panel__material': ['exact'],
             'panel__medium': ['exact'],
             'type_of_inscription': ['exact'],
-            'genre': ['exact'],
-            'tags': ['exact'],
             'elevation': ['exact', 'gt', 'lt'],
             'height': ['exact', 'gt', 'lt'],
             'width': ['exact', 'gt', 'lt'],
@@ -272,50 +369,199 @@ class InscriptionFilter(django_filters.FilterSet):
             'writing_system': ['exact'],
             'min_year': ['exact', 'lt', 'gt', 'lte', 'gte'],
             'max_year': ['exact', 'lt', 'gt', 'lte', 'gte'],
-            'dating_criteria': ['exact'],
-            'transcription': ['icontains'],
-            'interpretative_edition': ['icontains'],
-            'romanisation': ['icontains'],
-            'mentioned_person': ['exact'],
             'inscriber': ['exact'],
-            'condition': ['exact'],
-            'alignment': ['exact'],
-            'extra_alphabetical_sign': ['exact'],
-            'author': ['exact'],
         }
 
-    
-class InscriptionViewSet(DynamicDepthViewSet):
-    queryset = models.Inscription.objects.all()#.order_by('title')
+    def filter_m2m(self, queryset, name, value):
+        if not value:
+            # parameter not given
+            return queryset
+        return queryset.filter(_compile_lookup(f'{name}__in', value))
+
+    def filter_region(self, queryset, name, value):
+        position = models.parse_position_on_surface(value)
+        if position is None:
+            return queryset.none()
+        return queryset.filter(models.region_overlap_q(*position))
+
+    def filter_overlaps(self, queryset, name, value):
+        inscription = models.Inscription.objects.filter(pk=value).first()
+        if inscription is None:
+            return queryset.none()
+        return queryset.filter(pk__in=inscription.overlapping().values('pk'))
+
+    
+def _with_serializer_relations(queryset):
+    """Load what InscriptionSerializer reads per row (panel, its first orthophoto,
+    Korniienko images) in a fixed number of queries for the whole page."""
+    return queryset.select_related('panel').prefetch_related(
+        Prefetch(
+            'panel__images',
+            queryset=models.Image.objects.filter(type_of_image=1).order_by('pk'), # 1 is orthophotos
+            to_attr='orthophotos',
+        ),
+        'korniienko_image',
+    )
+
+
+class InscriptionViewSet(OptInCursorPaginationMixin, DynamicDepthViewSet):
+    queryset = _with_serializer_relations(models.Inscription.objects.all()).order_by('id')#.order_by('title')
     serializer_class = serializers.InscriptionSerializer
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     filterset_class = InscriptionFilter
-    # filterset_fields = get_fields(models.Inscription, exclude=DEFAULT_FIELDS)
+    # filterset_fields = get_fields(models.Inscription, exclude=DEFAULT_FIELDS + models.Inscription.DERIVED_FIELDS)
 
 
 # Search by multiple text fields as well as  korniienko number and panel title
-class SearchInscriptionViewSet(DynamicDepthViewSet):
+class SearchInscriptionViewSet(OptInCursorPaginationMixin, DynamicDepthViewSet):
     serializer_class = serializers.InscriptionSerializer
 
     def get_queryset(self):
-        queryset = _annotate_clean_fields(models.Inscription.objects.all())
+        queryset = models.Inscription.objects.all().order_by('id')
         search_term = self.request.query_params.get('q', None)
         
         if search_term:
+            # the search only uses EXISTS for related rows, so there are no duplicates to remove
             queryset = queryset.filter(
                 _build_search_q(search_term)
-            ).order_by('korniienko_image__title')
+            )
+            if not self.uses_cursor_pagination():
+                # by first Korniienko image title, then id
+                first_korniienko_title = models.KorniienkoImage.objects.filter(inscription=OuterRef('pk')).order_by('title').values('title')[:1]
+                queryset = queryset.annotate(korniienko_title=Subquery(first_korniienko_title)).order_by('korniienko_title', 'id')
 
-        return queryset.distinct()
+        return _with_serializer_relations(queryset)
     
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     filterset_class = InscriptionFilter
 
+class InscriptionStreamViewSet(ViewSet):
+    """
+        Streams the inscriptions matching the InscriptionFilter parameters as
+        newline-delimited JSON, one object per line, read with a server-side cursor.
+        Many-to-many relations are given as <field>_ids lists.
+        """
+
+    def list(self, request, *args, **kwargs):
+        filterset = InscriptionFilter(request.query_params, queryset=models.Inscription.objects.all(), request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=400)
+
+        try:
+            chunk_size = min(max(int(request.query_params.get('chunk_size', 2000)), 1), 10000)
+        except ValueError:
+            chunk_size = 2000
+
+        records = inscription_records(filterset.qs, chunk_size=chunk_size)
+        response = StreamingHttpResponse((json_line(record) for record in records), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'inline; filename="inscriptions.ndjson"'
+        return response
+
+
+class EpiDocViewSet(ViewSet):
+    """
+        Streams the EpiDoc editions of the inscriptions matching the InscriptionFilter
+        parameters as one TEI corpus, or with ?archive=zip as a zip of TEI documents.
+        """
+
+    def list(self, request, *args, **kwargs):
+        filterset = InscriptionFilter(request.query_params, queryset=models.Inscription.objects.all(), request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=400)
+
+        records = tei_records(epidoc_inscriptions(filterset.qs))
+        if request.query_params.get('archive') == 'zip':
+            response = StreamingHttpResponse(iter_tei_zip(records), content_type='application/zip')
+            response['Content-Disposition'] = 'attachment; filename="inscriptions-epidoc.zip"'
+        else:
+            response = StreamingHttpResponse(iter_tei_corpus(records), content_type='application/tei+xml')
+            response['Content-Disposition'] = 'inline; filename="inscriptions-epidoc.xml"'
+        return response
+
+
+class EpiDocConcordanceViewSet(ViewSet):
+    """
+        Keyword-in-context concordance of the words of the EpiDoc editions.
+        ?q= is matched against the normalized word forms (lowercase, without diacritics),
+        or with ?by=lemma against the lemmata; ?prefix=true matches words beginning with q.
+        Each hit comes with up to ?context= words (default 5, at most 20) on either side.
+        Results can be limited with the ``id`` and ``surface`` parameters.
+        """
+    max_hits = 500
+
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        q = params.get('q', '').strip()
+        by_lemma = params.get('by') == 'lemma'
+        if not by_lemma:
+            q = normalize_token(q)
+        if not q:
+            return Response([])
+
+        try:
+            context = min(max(int(params.get('context', 5)), 0), 20)
+        except ValueError:
+            context = 5
+        try:
+            limit = min(max(int(params.get('limit', 100)), 1), self.max_hits)
+        except ValueError:
+            limit = 100
+
+        lookup = f"{'lemma' if by_lemma else 'normalized'}{'__startswith' if params.get('prefix') == 'true' else ''}"
+        hits = list(
+            models.EpiDocToken.objects
+            .filter(**{lookup: q}, inscription__in=_scoped_inscriptions(params))
+            .order_by('inscription_id', 'source', 'position')
+            .values('inscription_id', 'inscription__denomination', 'source', 'position',
+                    'form', 'lemma', 'abbreviated', 'unclear', 'supplied')[:limit]
+        )
+        if not hits:
+            return Response([])
+
+        # the words around all hits in one query, served by the (inscription, source, position) index
+        windows = Q()
+        for hit in hits:
+            windows |= Q(
+                inscription_id=hit['inscription_id'], source=hit['source'],
+                position__range=(max(hit['position'] - context, 0), hit['position'] + context),
+            )
+        words = {
+            (inscription_id, source, position): form
+            for inscription_id, source, position, form in
+            models.EpiDocToken.objects.filter(windows).values_list('inscription_id', 'source', 'position', 'form')
+        }
+
+        def around(hit, positions):
+            return ' '.join(
+                words[key] for key in ((hit['inscription_id'], hit['source'], position) for position in positions)
+                if key in words
+            )
+
+        return Response([
+            {
+                "inscription": hit['inscription_id'],
+                "denomination": hit['inscription__denomination'],
+                "source": hit['source'],
+                "position": hit['position'],
+                "left": around(hit, range(hit['position'] - context, hit['position'])),
+                "keyword": hit['form'],
+                "right": around(hit, range(hit['position'] + 1, hit['position'] + context + 1)),
+                "lemma": hit['lemma'],
+                "abbreviated": hit['abbreviated'],
+                "unclear": hit['unclear'],
+                "supplied": hit['supplied'],
+            }
+            for hit in hits
+        ])
+
+
 class AutoCompleteInscriptionViewSet(ViewSet):
     """
         Returns inscriptions that start with a given string based on search fields, 
         for autocomplete purposes.
         We also need to add ids to be able to link the suggestions to the actual inscription.
+        Suggestions are read from the trigram-indexed InscriptionSuggestion table in a
+        single query, ranking prefix matches first and then by trigram similarity.
         """
 
     def list(self, request, *args, **kwargs):
@@ -323,136 +569,89 @@ class AutoCompleteInscriptionViewSet(ViewSet):
         if not q:
             return Response([])
 
-        q = q.strip().lower()
+        q = unicodedata.normalize('NFC', q).strip().lower()
         if not q:
             return Response([])
     
-        limit = 10  # Limit the number of results for autocomplete
-        suggestions = {}  # (value, source) -> set(ids)
-        entity_q = _to_html_entities(q)
-
-        def add_suggestions(filtered_qs, label):
-            seen = {}  # val_key -> canonical val_str
-            for row in filtered_qs:
-                if not row:
-                    continue
-                value, inscription_id = row
-                if value:
-                    val_str = html_module.unescape(strip_tags(str(value))).strip()
-                    val_key = val_str.lower()
-                    if q in val_key:
-                        # Use the first-seen casing for the display string
-                        if val_key not in seen:
-                            seen[val_key] = val_str
-                        canonical = seen[val_key]
-                        key = (canonical, label)
-                        suggestions.setdefault(key, set()).add(inscription_id)
-
-        # Search in various fields, using both Unicode and HTML-entity forms for RichText fields
-        inscriptions = _annotate_clean_fields(models.Inscription.objects.all())
-        add_suggestions(
-            inscriptions.filter(title__icontains=q).values_list('title', 'id').distinct()[:limit],
-            'Title'
-        )
-        add_suggestions(
-            inscriptions.filter(panel__title__icontains=q).values_list('panel__title', 'id').distinct()[:limit],
-            'Panel Title'
-        )
+        limit = 20  # Limit the number of results for autocomplete
 
-        # RichText fields: search with clean annotation (Unicode) OR raw field (entity-encoded)
-        for field, label in [
-            ('transcription', 'Transcription'),
-            ('interpretative_edition', 'Interpretative Edition'),
-            ('romanisation', 'Romanisation'),
-            ('translation_eng', 'Translation (ENG)'),
-            ('translation_ukr', 'Translation (UKR)'),
-        ]:
-            clean = f'clean_{field}'
-            filt = Q(**{f'{clean}__icontains': q})
-            if entity_q != q:
-                filt |= Q(**{f'{field}__icontains': entity_q})
-            add_suggestions(
-                inscriptions.filter(filt).values_list(clean, 'id').distinct()[:limit],
-                label,
+        suggestions = (
+            models.InscriptionSuggestion.objects
+            .filter(normalized__contains=q)
+            .values('normalized', 'source')
+            .annotate(
+                display_value=Min('value'),
+                ids=ArrayAgg('inscription_id', distinct=True),
+                is_prefix=Max(Case(When(normalized__startswith=q, then=Value(1)), default=Value(0), output_field=IntegerField())),
+                similarity=Max(TrigramSimilarity('normalized', q)),
             )
-
-        add_suggestions(
-            inscriptions.filter(mentioned_person__name__icontains=q).values_list('mentioned_person__name', 'id').distinct()[:limit],
-            'Mentioned Person'
+            .order_by('-is_prefix', '-similarity', 'display_value')[:limit]
         )
-        add_suggestions(
-            inscriptions.filter(korniienko_image__title__icontains=q).values_list('korniienko_image__title', 'id').distinct()[:limit],
-            'Korniienko Image Title'
-        )   
-
-        # Limit the total number of suggestions
-                # duplicate and sort
-        sorted_suggestions = sorted(
-            [
-                {
-                    "value": value,
-                    "source": source,
-                    "ids": sorted(list(ids)),
-                    # **({"id": next(iter(ids))} if len(ids) == 1 else {})
-                }
-                for (value, source), ids in suggestions.items()
-            ],
-            key=lambda x: x["value"]
-        )[:20]
-
-        return Response(sorted_suggestions)
+
+        return Response([
+            {
+                "value": suggestion['display_value'],
+                "source": suggestion['source'],
+                "ids": sorted(suggestion['ids']),
+            }
+            for suggestion in suggestions
+        ])
+
+
+class NeighborsViewSet(ViewSet):
+    """
+        Returns the previous and next ids of each object in ?ids=1,2,3 (primary key
+        order, null at either end), for viewer navigation. One query for all ids,
+        at most max_ids of them.
+        """
+    model = None
+    max_ids = 1000
+
+    def list(self, request, *args, **kwargs):
+        ids = [int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip().isdigit()]
+        if len(ids) > self.max_ids:
+            return Response({"ids": f"At most {self.max_ids} ids can be given."}, status=400)
+        neighbors = self.model.neighbors(ids) if ids else {}
+
+        return Response([
+            {"id": pk, "previous": previous_pk, "next": next_pk}
+            for pk, (previous_pk, next_pk) in sorted(neighbors.items())
+        ])
+
+
+class PanelNeighborsViewSet(NeighborsViewSet):
+    model = models.Panel
+
+
+class InscriptionNeighborsViewSet(NeighborsViewSet):
+    model = models.Inscription
 
 
 class InscriptionTagsViewSet(DynamicDepthViewSet):
     queryset = models.Inscription.objects.all().order_by('id')
     serializer_class = serializers.InscriptionSerializer  # Add this line
-    filterset_fields = get_fields(models.Inscription, exclude=DEFAULT_FIELDS+['pixels'])
+    filterset_fields = get_fields(models.Inscription, exclude=DEFAULT_FIELDS+['pixels']+models.Inscription.DERIVED_FIELDS)
     
     def list(self, request):
-        queryset = models.Inscription.objects.all().order_by('id')
-        filterset_fields = get_fields(models.Inscription, exclude=DEFAULT_FIELDS+['pixels'])
-        
-        all_tags = models.Tag.objects.all().order_by('text')
-        
-        surface = self.request.query_params.get('surface')
-        
-        if surface:
-            inscriptions = queryset.filter(panel__title__contains = surface)
-        else:
-            inscriptions = queryset
-        
-        serializer = serializers.InscriptionSerializer(inscriptions, many=True)
-        
-        formatted_data = []
-        list_of_tags = []
-        for inscription in serializer.data:
-            
-            tags = inscription.get('tags')
-            
-            for tag_id in tags:
-                
-                selected_tag = all_tags.get(pk=tag_id)
-                
-                if selected_tag.text not in list_of_tags:
-                    data = {
-                        "tag_eng" : selected_tag.text,
-                        "tag_ukr" : selected_tag.text_ukr
-                    }
-                    
-                    list_of_tags.append(selected_tag.text)
-                    formatted_data.append(data)
+        inscriptions = _scoped_inscriptions(self.request.query_params)
+        # one row per distinct text, as tags are shown by name
+        tags = models.Tag.objects.filter(
+            Exists(models.Inscription.tags.through.objects.filter(tag_id=OuterRef('pk'), inscription__in=inscriptions))
+        ).order_by('text', 'pk').distinct('text').values_list('text', 'text_ukr')
+
+        formatted_data = [
+            {
+                "tag_eng" : text,
+                "tag_ukr" : text_ukr
+            }
+            for text, text_ukr in tags
+        ]
         
         return Response(formatted_data)
     
-def inscription_contains_str(string, inscription):
-    denomination = f"{inscription.panel.title}:{inscription.id}"
-    
-    return denomination.startswith(string)
-
-
 class InscriptionStringViewSet(DynamicDepthViewSet):
     serializer_class = serializers.InscriptionSerializer
-    filterset_fields = get_fields(models.Inscription, exclude=DEFAULT_FIELDS + ['pixels'])
+    filterset_fields = get_fields(models.Inscription, exclude=DEFAULT_FIELDS + ['pixels'] + models.Inscription.DERIVED_FIELDS)
     
     def get_queryset(self):
         queryset = models.Inscription.objects.all()
@@ -460,8 +659,7 @@ class InscriptionStringViewSet(DynamicDepthViewSet):
         str = self.request.query_params.get('str')
         
         if str:
-            ids_containing_str = [inscription.id for inscription in queryset if inscription_contains_str(str, inscription)] 
-            queryset = queryset.filter(Q(id__in=ids_containing_str) | Q(title__startswith=str))
+            queryset = queryset.filter(Q(denomination__startswith=str) | Q(title__startswith=str))
             
         return queryset 
     
@@ -469,47 +667,39 @@ class InscriptionStringViewSet(DynamicDepthViewSet):
 class AnnotationViewSet(DynamicDepthViewSet):
     queryset = models.Inscription.objects.all().order_by('id')
     serializer_class = serializers.InscriptionSerializer
-    filterset_fields = get_fields(models.Inscription, exclude=DEFAULT_FIELDS+['pixels'])
+    filterset_fields = get_fields(models.Inscription, exclude=DEFAULT_FIELDS+['pixels']+models.Inscription.DERIVED_FIELDS)
     
     def list(self, request):
-        queryset = models.Inscription.objects.all().order_by('id')
-        filterset_fields = get_fields(models.Inscription, exclude=DEFAULT_FIELDS+['pixels'])
-        
-        surface = self.request.query_params.get('surface')
-        
-        if surface:
-            annotations = queryset.filter(panel__title = surface)
-        else:
-            annotations = queryset
-        
-        serializer = serializers.InscriptionSerializer(annotations, many=True)
-        
-        list_to_return = []
-        for annotation in serializer.data:
-            pct_position = annotation.get('position_on_surface')
-            if pct_position is not None:
-                pct_to_percent_string = pct_position.replace("pct", "percent")
-            else:
-                pct_to_percent_string = ""
-            data = {
-                "type": "Annotation",
-                "body": [
-                    {"value": f"Inscription {annotation.get('panel')}:{annotation.get('id')}"} # 
-                ],
-                "target": {
-                    "selector": {
-                        "type": "FragmentSelector",
-                        "conformsTo": "http://www.w3.org/TR/media-frags/",
-                        "value": f"xywh={pct_to_percent_string}"
-                    }
-                },
-                "id": annotation.get('id')
-            }
-            list_to_return.append(data)
+        inscriptions = annotation_inscriptions(self.request.query_params.get('surface'))
+        list_to_return = [build_annotation(*row) for row in annotation_rows(inscriptions)]
         
         return Response(list_to_return)
 
 
+class AnnotationPageViewSet(ViewSet):
+    """
+        Returns the annotations of a surface (?surface=<panel title>, or of all
+        surfaces) as a W3C AnnotationPage, streamed row by row. Each page is cached
+        until an inscription or orthophoto of it is saved, added or deleted.
+        """
+    content_type = 'application/ld+json; profile="http://www.w3.org/ns/anno.jsonld"'
+
+    def list(self, request, *args, **kwargs):
+        surface = request.query_params.get('surface')
+        panel = models.Panel.objects.filter(title=surface).order_by('pk').first() if surface else None
+        inscriptions = annotation_inscriptions(surface)
+        page_id = annotation_page_id(request, panel)
+        if surface and panel is None:
+            # an empty page, not worth a cache entry
+            return StreamingHttpResponse(annotation_page_chunks(page_id, inscriptions), content_type=self.content_type)
+        cache_key = annotation_page_cache_key(page_id, panel, inscriptions)
+
+        page = cache.get(cache_key)
+        if page is not None:
+            return HttpResponse(page, content_type=self.content_type)
+        return StreamingHttpResponse(annotation_page_chunks(page_id, inscriptions, cache_key), content_type=self.content_type)
+
+
 class ImageFilter(django_filters.FilterSet):
     # panel__title = django_filters.CharFilter()
 
@@ -546,20 +736,8 @@ class IIIFImageViewSet(DynamicDepthViewSet):
     # filterset_fields = get_fields(models.Image, exclude=DEFAULT_FIELDS + ['iiif_file', 'file']) + ['panel__medium', 'panel__material']
     
     def get_queryset(self):
-        orthophotos = models.Image.objects.all().filter(type_of_image__text="Orthophoto")
-        topography = models.Image.objects.all().filter(type_of_image__text="Topography")
-        topography_blended = topography.filter(file__contains="blended_map")
-        topography_texture = topography.filter(file__contains="texture_map")
-        topography_normal = topography.filter(file__contains="normal_map")
-        
-        custom_order = Case(
-            When(type_of_image__text="Orthophoto", then=Value(1)),
-            When(file__contains="blended_map", then=Value(2)),
-            When(file__contains="texture_map", then=Value(3)),
-            When(file__contains="normal_map", then=Value(4))
-        )
-        
-        queryset = (orthophotos | topography_blended | topography_texture | topography_normal).annotate(custom_order=custom_order).order_by('custom_order')
+        # orthophotos first, then the blended, texture and normal topography maps
+        queryset = models.Image.objects.filter(role__in=models.ImageRole.values).order_by('role', 'id')
         
         return queryset
     
@@ -582,88 +760,72 @@ class ObjectMesh3DViewSet(DynamicDepthViewSet):
     filterset_fields = get_fields(models.ObjectMesh3D, exclude=DEFAULT_FIELDS)
 
 
-class DataWidgetViewSet(DynamicDepthViewSet):
-    queryset = models.Inscription.objects.all()
-    serializer_class = serializers.InscriptionSerializer
-
-    def list(self, request):
-        # Query Parameters 
-        type_of_inscription = self.request.query_params.get('type_of_inscription')
-        writing_system = self.request.query_params.get('writing_system')
-        textual_genre = self.request.query_params.get('genre')
-        pictorial_description = self.request.query_params.get('tags')
-        language = self.request.query_params.get('language')
-        surface_id = self.request.query_params.get('panel')
-        inscription_id = self.request.query_params.get('id')
-        medium = self.request.query_params.get('medium')
-        material = self.request.query_params.get('material')
-        alignment = self.request.query_params.get('alignment')
-        condition = self.request.query_params.get('condition')
-        mentioned_person = self.request.query_params.get('mentioned_person')
-        panel_title_str = self.request.query_params.get('panel_title_str')
-        inscription_title_str = self.request.query_params.get('inscription_title_str')
-
-        # Filtering places 
-        count_all_inscriptions = models.Inscription.objects.all().count()
-        inscriptions = models.Inscription.objects.all()
-        
-        if type_of_inscription:
-            inscriptions = inscriptions.filter(Q(type_of_inscription__id__exact=type_of_inscription))
-        
-        if writing_system:
-            inscriptions = inscriptions.filter(writing_system__id__exact=writing_system)
-        
-        if textual_genre:
-            inscriptions = inscriptions.filter(genre__id__exact=textual_genre)
+# data widget filters that the facet index does not cover, applied in the database
+_WIDGET_DB_FILTERS = {param: _INSCRIPTION_FILTERS[param] for param in ('panel_title_str', 'inscription_title_str')}
 
-        if pictorial_description:
-            inscriptions = inscriptions.filter(tags__id__exact=pictorial_description)
 
-        if language:
-            inscriptions = inscriptions.filter(language__id__exact=language)
+def _indexed_widget_counts(params, inscriptions):
+    """Data widget counts from the facet index.
 
-        if surface_id:
-            inscriptions = inscriptions.filter(panel__id__exact=surface_id)
-
-        if inscription_id:
-            inscriptions = inscriptions.filter(id=inscription_id)
-
-        if medium:
-            inscriptions = inscriptions.filter(panel__medium__id__exact=medium)
-        
-        if material:
-            inscriptions = inscriptions.filter(panel__material__exact=material)
-
-        if alignment:
-            inscriptions = inscriptions.filter(alignment__id__exact=alignment)
-
-        if condition:
-            inscriptions = inscriptions.filter(condition__id__exact=condition)
+    Filters on indexed dimensions are bitmap intersections. *inscriptions*
+    holds the remaining database-side restrictions and is only queried when
+    it actually filters something.
+    """
+    bitmap = facet_index.filter(params)
+    if inscriptions.query.has_filters():
+        bitmap &= bitmap_from_ids(inscriptions.values_list('pk', flat=True))
+
+    count_all_inscriptions = facet_index.count()
+    count_inscriptions_shown = facet_index.count(bitmap)
+    return {
+        'all_inscriptions': count_all_inscriptions,
+        'shown_inscriptions': count_inscriptions_shown,
+        'hidden_inscriptions': count_all_inscriptions - count_inscriptions_shown,
+        'textual_inscriptions': facet_index.count(bitmap, type_of_inscription=1), # 1 is for textual inscriptions
+        'pictorial_inscriptions': facet_index.count(bitmap, type_of_inscription=2), # 2 is for pictorial inscriptions
+        'composites_inscriptions': facet_index.count(bitmap, type_of_inscription=3), # 3 is for composite inscriptions
+    }
+
+
+def _database_widget_counts(inscriptions):
+    """Data widget counts from a single conditional aggregate over *inscriptions*.
+
+    The filtered queryset has one row per inscription (see _compile_lookup),
+    so plain counts need no DISTINCT. The unfiltered total is cached.
+    """
+    counts = inscriptions.aggregate(
+        shown=Count('pk'),
+        textual=Count('pk', filter=Q(type_of_inscription_id=1)), # 1 is for textual inscriptions
+        pictorial=Count('pk', filter=Q(type_of_inscription_id=2)), # 2 is for pictorial inscriptions
+        composite=Count('pk', filter=Q(type_of_inscription_id=3)), # 3 is for composite inscriptions
+    )
 
-        if mentioned_person:
-            inscriptions = inscriptions.filter(mentioned_person__id__exact=mentioned_person)
+    count_all_inscriptions = inscription_count()
+    return {
+        'all_inscriptions': count_all_inscriptions,
+        'shown_inscriptions': counts['shown'],
+        'hidden_inscriptions': count_all_inscriptions - counts['shown'],
+        'textual_inscriptions': counts['textual'],
+        'pictorial_inscriptions': counts['pictorial'],
+        'composites_inscriptions': counts['composite'],
+    }
 
-        if panel_title_str:
-            inscriptions = inscriptions.filter(panel__title__startswith=panel_title_str)
 
-        if inscription_title_str:
-            inscriptions = inscriptions.filter(title__startswith=inscription_title_str)
+class DataWidgetViewSet(DynamicDepthViewSet):
+    queryset = models.Inscription.objects.all()
+    serializer_class = serializers.InscriptionSerializer
 
-        count_inscriptions_shown = inscriptions.all().count()
-        count_hidden_inscriptions = count_all_inscriptions -  count_inscriptions_shown
+    def list(self, request):
+        if facet_index_enabled():
+            inscriptions = _filter_inscriptions(models.Inscription.objects.all(), self.request.query_params, _WIDGET_DB_FILTERS)
+            data = _indexed_widget_counts(self.request.query_params, inscriptions)
+            response = HttpResponse(json.dumps(data))
+            # every change to the indexed data changes the version
+            response['ETag'] = f'"{facet_index.version}"'
+            return response
 
-        count_textual_inscriptions = inscriptions.filter(type_of_inscription__id__exact=1).count() # 1 is for textual inscriptions
-        count_pictorial_inscriptions = inscriptions.filter(type_of_inscription__id__exact=2).count() # 2 is for textual inscriptions
-        count_composite_inscriptions = inscriptions.filter(type_of_inscription__id__exact=3).count() # 3 is for textual inscriptions
-        
-        data = {
-            'all_inscriptions': count_all_inscriptions,
-            'shown_inscriptions': count_inscriptions_shown,
-            'hidden_inscriptions': count_hidden_inscriptions,
-            'textual_inscriptions': count_textual_inscriptions,
-            'pictorial_inscriptions': count_pictorial_inscriptions,
-            'composites_inscriptions': count_composite_inscriptions
-        }
+        inscriptions = _filter_inscriptions(models.Inscription.objects.all(), self.request.query_params)
+        data = _database_widget_counts(inscriptions)
 
         return HttpResponse(json.dumps(data))
 
@@ -678,75 +840,128 @@ class SearchDataWidgetViewSet(DynamicDepthViewSet):
     serializer_class = serializers.InscriptionSerializer
 
     def list(self, request, *args, **kwargs): 
-        # Query Parameters
-        q = (self.request.query_params.get('q') or '').strip()
-
-        # Base filter widget parameters
-        filter_mapping = {
-            'type_of_inscription': 'type_of_inscription__id__exact',
-            'writing_system': 'writing_system__id__exact',
-            'genre': 'genre__id__exact',
-            'tags': 'tags__id__exact',
-            'language': 'language__id__exact',
-            'panel': 'panel__id__exact',
-            'id': 'id',
-            'medium': 'panel__medium__id__exact',
-            'material': 'panel__material__exact',
-            'alignment': 'alignment__id__exact',
-            'condition': 'condition__id__exact',
-            'mentioned_person': 'mentioned_person__id__exact',
-            'panel_title_str': 'panel__title__startswith',
-            'inscription_title_str': 'title__startswith',
-        }
+        if facet_index_enabled():
+            inscriptions = _filter_inscriptions(models.Inscription.objects.all(), self.request.query_params, _WIDGET_DB_FILTERS)
+            inscriptions = _search_inscriptions(inscriptions, self.request.query_params)
+            data = _indexed_widget_counts(self.request.query_params, inscriptions)
+            return HttpResponse(json.dumps(data, ensure_ascii=False), content_type='application/json')
+
+        inscriptions = _filter_inscriptions(models.Inscription.objects.all(), self.request.query_params)
+        inscriptions = _search_inscriptions(inscriptions, self.request.query_params)
+        data = _database_widget_counts(inscriptions)
+        return HttpResponse(json.dumps(data, ensure_ascii=False), content_type='application/json')
 
-        # Exact item selection parameters from autocomplete
-        search_mapping = {
-            'title': 'title__icontains',
-            'panel': 'panel__title__icontains',
-            'transcription': 'transcription__icontains',
-            'interpretative_edition': 'interpretative_edition__icontains',
-            'romanisation': 'romanisation__icontains',
-            'translation_eng': 'translation_eng__icontains',
-            'translation_ukr': 'translation_ukr__icontains',
-            'mentioned_person_name': 'mentioned_person__name__icontains',
-            'korniienko_image_title': 'korniienko_image__title__icontains',
-        }
+# (facet key, label key, FK or M2M field on Inscription) of the text facets of the summaries
+_SUMMARY_TEXT_FACETS = [
+    ('type_of_inscription', 'type', 'type_of_inscription'),
+    ('writing_system', 'writing_system', 'writing_system'),
+    ('language', 'language', 'language'),
+    ('textual_genre', 'textual_genre', 'genre'),
+    ('pictorial_description', 'pictorial_description', 'tags'),
+]
+_SUMMARY_YEAR_FACETS = ['min_year', 'max_year', 'avg_year']
 
-        count_all_inscriptions = models.Inscription.objects.count()
-        inscriptions = _annotate_clean_fields(models.Inscription.objects.all())
 
-        for param, lookup in filter_mapping.items():
-            value = self.request.query_params.get(param)
-            if value:
-                inscriptions = inscriptions.filter(**{lookup: value})
+def _summary_facets_sql(queryset):
+    """Build the single GROUPING SETS query counting the filtered inscriptions
+    per value of every summary facet.
 
-        # Two autocomplete modes:
-        # 1) q provided => partial text search across supported fields.
-        # 2) no q => exact field matching for selected autocomplete item(s).
-        if q:
-            inscriptions = inscriptions.filter(_build_search_q(q))
+    Each grouping set groups by the columns of one facet only, so every result
+    row belongs to exactly one facet and the columns of the other facets are
+    NULL. GROUPING() over all the facet columns tells the rows apart.
+    """
+    qn = connections[queryset.db].ops.quote_name
+    inscription = models.Inscription._meta
+    pk = qn(inscription.pk.column)
+    ids_sql, params = queryset.order_by().values('pk').query.sql_with_params()
+
+    joins = []
+    text_columns = []
+    for index, (_, _, field_name) in enumerate(_SUMMARY_TEXT_FACETS):
+        field = inscription.get_field(field_name)
+        alias = f'facet{index}'
+        target = qn(field.related_model._meta.db_table)
+        target_pk = qn(field.related_model._meta.pk.column)
+        if field.many_to_many:
+            through = field.remote_field.through._meta
+            link = f'{alias}_link'
+            joins.append(
+                f'LEFT JOIN {qn(through.db_table)} {link} '
+                f'ON {link}.{qn(through.get_field(field.m2m_field_name()).column)} = f.{pk} '
+                f'LEFT JOIN {target} {alias} '
+                f'ON {alias}.{target_pk} = {link}.{qn(through.get_field(field.m2m_reverse_field_name()).column)}'
+            )
         else:
-            for param, lookup in search_mapping.items():
-                value = self.request.query_params.get(param)
-                if value:
-                    inscriptions = inscriptions.filter(**{lookup: value})
-
-        inscriptions = inscriptions.distinct()
-
-        count_inscriptions_shown = inscriptions.all().count()
-        count_hidden_inscriptions = count_all_inscriptions -  count_inscriptions_shown
-        count_textual_inscriptions = inscriptions.filter(type_of_inscription__id__exact=1).count() # 1 is for textual inscriptions
-        count_pictorial_inscriptions = inscriptions.filter(type_of_inscription__id__exact=2).count() # 2 is for textual inscriptions
-        count_composite_inscriptions = inscriptions.filter(type_of_inscription__id__exact=3).count() # 3 is for textual inscriptions
-        data = {
-            'all_inscriptions': count_all_inscriptions,
-            'shown_inscriptions': count_inscriptions_shown,
-            'hidden_inscriptions': count_hidden_inscriptions,                   
-            'textual_inscriptions': count_textual_inscriptions,
-            'pictorial_inscriptions': count_pictorial_inscriptions,
-            'composites_inscriptions': count_composite_inscriptions
-        }
-        return HttpResponse(json.dumps(data, ensure_ascii=False), content_type='application/json')
+            joins.append(f'LEFT JOIN {target} {alias} ON {alias}.{target_pk} = f.{qn(field.column)}')
+        text_columns.append((f'{alias}.{qn("text")}', f'{alias}.{qn("text_ukr")}'))
+
+    fk_columns = ', '.join(
+        qn(inscription.get_field(field_name).column)
+        for _, _, field_name in _SUMMARY_TEXT_FACETS
+        if not inscription.get_field(field_name).many_to_many
+    )
+    min_year, max_year = qn('min_year'), qn('max_year')
+    year_columns = [f'f.{min_year}', f'f.{max_year}', 'f.avg_year']
+    grouping_columns = [text for text, _ in text_columns] + year_columns
+    grouping_sets = [f'({text}, {text_ukr})' for text, text_ukr in text_columns] + [f'({column})' for column in year_columns]
+
+    sql = f"""
+        SELECT
+            GROUPING({', '.join(grouping_columns)}) AS grouping_set,
+            COALESCE({', '.join(text for text, _ in text_columns)}) AS text,
+            COALESCE({', '.join(text_ukr for _, text_ukr in text_columns)}) AS text_ukr,
+            COALESCE({', '.join(year_columns)}) AS year,
+            COUNT(DISTINCT f.{pk}) AS count
+        FROM (
+            SELECT {pk}, {fk_columns}, {min_year}, {max_year},
+                CASE WHEN {min_year} IS NOT NULL AND {max_year} IS NOT NULL AND {max_year} <= {min_year} + 200
+                     THEN ({min_year} + {max_year}) / 2 END AS avg_year
+            FROM {qn(inscription.db_table)}
+            WHERE {pk} IN ({ids_sql})
+        ) f
+        {' '.join(joins)}
+        GROUP BY GROUPING SETS ({', '.join(grouping_sets)})
+    """
+    return sql, params
+
+
+def _summarize_inscriptions(queryset):
+    """Summarize the inscriptions of *queryset* by type, writing system,
+    language, genre, pictorial description and dating, in one database round trip."""
+    summary = {facet: [] for facet, _, _ in _SUMMARY_TEXT_FACETS}
+    summary.update({facet: [] for facet in _SUMMARY_YEAR_FACETS})
+    facets = [facet for facet, _, _ in _SUMMARY_TEXT_FACETS] + _SUMMARY_YEAR_FACETS
+    labels = dict((facet, label) for facet, label, _ in _SUMMARY_TEXT_FACETS)
+
+    # GROUPING() sets the bit of every column that is *not* grouped in the row's set
+    all_bits = (1 << len(facets)) - 1
+    facet_by_grouping = {all_bits ^ (1 << (len(facets) - 1 - index)): facet for index, facet in enumerate(facets)}
+
+    sql, params = _summary_facets_sql(queryset)
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    for grouping_set, text, text_ukr, year, count in rows:
+        facet = facet_by_grouping[grouping_set]
+        if facet in labels:
+            if text:
+                label = labels[facet]
+                summary[facet].append({label: text, f"{label}_ukr": text_ukr, "count": count})
+        elif facet == 'avg_year':
+            if year is not None:
+                summary[facet].append({facet: year, "count": count})
+        elif year:
+            summary[facet].append({facet: year, "count": count})
+
+    for facet in facets:
+        if facet == 'avg_year':
+            summary[facet].sort(key=lambda entry: entry['avg_year'])
+        else:
+            summary[facet].sort(key=lambda entry: -entry['count'])
+
+    return summary
+
 
 class SummaryViewSet(DynamicDepthViewSet):
     """A separate viewset to return summary data for inscriptions."""
@@ -756,66 +971,8 @@ class SummaryViewSet(DynamicDepthViewSet):
     filterset_class = InscriptionFilter  # Use the same filter as InscriptionViewSet
 
     def list(self, request, *args, **kwargs):
-        # Query Parameters (matching DataWidgetViewSet exactly)
-        type_of_inscription = self.request.query_params.get('type_of_inscription')
-        writing_system = self.request.query_params.get('writing_system')
-        textual_genre = self.request.query_params.get('genre')
-        pictorial_description = self.request.query_params.get('tags')
-        language = self.request.query_params.get('language')
-        surface_id = self.request.query_params.get('panel')
-        inscription_id = self.request.query_params.get('id')
-        medium = self.request.query_params.get('medium')
-        material = self.request.query_params.get('material')
-        alignment = self.request.query_params.get('alignment')
-        condition = self.request.query_params.get('condition')
-        mentioned_person = self.request.query_params.get('mentioned_person')
-        panel_title_str = self.request.query_params.get('panel_title_str')
-        inscription_title_str = self.request.query_params.get('inscription_title_str')
-
         # Filtering inscriptions (matching DataWidgetViewSet exactly)
-        inscriptions = models.Inscription.objects.all()
-        
-        if type_of_inscription:
-            inscriptions = inscriptions.filter(Q(type_of_inscription__id__exact=type_of_inscription))
-        
-        if writing_system:
-            inscriptions = inscriptions.filter(writing_system__id__exact=writing_system)
-        
-        if textual_genre:
-            inscriptions = inscriptions.filter(genre__id__exact=textual_genre)
-
-        if pictorial_description:
-            inscriptions = inscriptions.filter(tags__id__exact=pictorial_description)
-
-        if language:
-            inscriptions = inscriptions.filter(language__id__exact=language)
-
-        if surface_id:
-            inscriptions = inscriptions.filter(panel__id__exact=surface_id)
-
-        if inscription_id:
-            inscriptions = inscriptions.filter(id=inscription_id)
-
-        if medium:
-            inscriptions = inscriptions.filter(panel__medium__id__exact=medium)
-        
-        if material:
-            inscriptions = inscriptions.filter(panel__material__exact=material)
-
-        if alignment:
-            inscriptions = inscriptions.filter(alignment__id__exact=alignment)
-
-        if condition:
-            inscriptions = inscriptions.filter(condition__id__exact=condition)
-
-        if mentioned_person:
-            inscriptions = inscriptions.filter(mentioned_person__id__exact=mentioned_person)
-
-        if panel_title_str:
-            inscriptions = inscriptions.filter(panel__title__startswith=panel_title_str)
-
-        if inscription_title_str:
-            inscriptions = inscriptions.filter(title__startswith=inscription_title_str)
+        inscriptions = _filter_inscriptions(models.Inscription.objects.all(), self.request.query_params)
 
         # Generate summary with filtered inscriptions
         summary_data = self.summarize_results(inscriptions)
@@ -824,138 +981,8 @@ class SummaryViewSet(DynamicDepthViewSet):
     
 
     def summarize_results(self, queryset):
-        """Summarizes search results by creator and institution."""
-
-        summary = {
-            "type_of_inscription": [],
-            "writing_system": [],
-            "language": [],
-            "textual_genre": [],
-            "pictorial_description": [],
-            "min_year": [],
-            "max_year": [],
-            "avg_year": [],
-        }
-
-        # Count images per creator
-        type_of_inscription_counts = (
-            queryset
-            .values("type_of_inscription__text", "type_of_inscription__text_ukr")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-
-        # Count images per institution
-        writing_system_counts = (
-            queryset
-            .values("writing_system__text", "writing_system__text_ukr")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-        # Count of documentation types by site
-        language_counts = (
-            queryset
-            .values("language__text", "language__text_ukr")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-        # Summarise search results by motif type
-        textual_genre_counts = (
-            queryset
-            .values("genre__text", "genre__text_ukr")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-        # Show number of images for each year 
-        pictorial_description_counts = (
-            queryset
-            .values("tags__text", "tags__text_ukr")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-
-        min_year_counts = (
-            queryset
-            .values("min_year")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-        max_year_counts = (
-            queryset
-            .values("max_year")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-
-        # Calculate average year and group by it
-        avg_year_counts = (
-            queryset
-            .filter(min_year__isnull=False, max_year__isnull=False, max_year__lte=F('min_year') + 200)  # Only include records with both years
-            .annotate(
-                avg_year=Cast((F('min_year') + F('max_year')) / 2, IntegerField())
-            )
-            .values("avg_year")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("avg_year")
-        )
-
-        # Format summary
-        summary["type_of_inscription"] = [
-            {
-                "type": entry["type_of_inscription__text"], 
-                "type_ukr": entry["type_of_inscription__text_ukr"], 
-                "count": entry["count"]}
-            for entry in type_of_inscription_counts if entry["type_of_inscription__text"]
-        ]
-
-        summary["writing_system"] = [
-            {
-                "writing_system": entry["writing_system__text"], 
-                "writing_system_ukr": entry["writing_system__text_ukr"],
-                "count": entry["count"]}
-            for entry in writing_system_counts if entry["writing_system__text"]
-        ]   
-
-        summary["language"] = [
-            {
-                "language": entry["language__text"], 
-                "language_ukr": entry["language__text_ukr"],
-                "count": entry["count"]}
-            for entry in language_counts if entry["language__text"]
-        ]
-
-        summary["textual_genre"] = [
-            {
-                "textual_genre": entry["genre__text"], 
-                "textual_genre_ukr": entry["genre__text_ukr"],
-                "count": entry["count"]}
-            for entry in textual_genre_counts if entry["genre__text"]
-        ]
-
-        summary["pictorial_description"] = [
-            {
-                "pictorial_description": entry["tags__text"], 
-                "pictorial_description_ukr": entry["tags__text_ukr"],
-                "count": entry["count"]}
-            for entry in pictorial_description_counts if entry["tags__text"]
-        ]
-
-        summary["min_year"] = [
-            {"min_year": entry["min_year"], "count": entry["count"]}
-            for entry in min_year_counts if entry["min_year"]
-        ]
-
-        summary["max_year"] = [
-            {"max_year": entry["max_year"], "count": entry["count"]}
-            for entry in max_year_counts if entry["max_year"]
-        ]
-
-        summary["avg_year"] = [
-            {"avg_year": entry["avg_year"], "count": entry["count"]}
-            for entry in avg_year_counts if entry["avg_year"] is not None
-        ]
-
-        return summary
+        """Summarizes search results by inscription metadata."""
+        return _summarize_inscriptions(queryset)
     
 
 class DataSummaryViewSet(DynamicDepthViewSet):
@@ -966,184 +993,14 @@ class DataSummaryViewSet(DynamicDepthViewSet):
     filterset_class = InscriptionFilter  # Use the same filter as InscriptionViewSet
 
     def list(self, request, *args, **kwargs): 
-        # Query Parameters
-        q = (self.request.query_params.get('q') or '').strip()
-
-        # Base filter widget parameters
-        filter_mapping = {
-            'type_of_inscription': 'type_of_inscription__id__exact',
-            'writing_system': 'writing_system__id__exact',
-            'genre': 'genre__id__exact',
-            'tags': 'tags__id__exact',
-            'language': 'language__id__exact',
-            'panel': 'panel__id__exact',
-            'id': 'id',
-            'medium': 'panel__medium__id__exact',
-            'material': 'panel__material__exact',
-            'alignment': 'alignment__id__exact',
-            'condition': 'condition__id__exact',
-            'mentioned_person': 'mentioned_person__id__exact',
-            'panel_title_str': 'panel__title__startswith',
-            'inscription_title_str': 'title__startswith',
-        }
-
-        # Exact item selection parameters from autocomplete
-        search_mapping = {
-            'title': 'title__icontains',
-            'panel': 'panel__title__icontains',
-            'transcription': 'transcription__icontains',
-            'interpretative_edition': 'interpretative_edition__icontains',
-            'romanisation': 'romanisation__icontains',
-            'translation_eng': 'translation_eng__icontains',
-            'translation_ukr': 'translation_ukr__icontains',
-            'mentioned_person_name': 'mentioned_person__name__icontains',
-            'korniienko_image_title': 'korniienko_image__title__icontains',
-        }
-
-        # Filtering inscriptions (matching DataWidgetViewSet exactly)
-        inscriptions = _annotate_clean_fields(models.Inscription.objects.all())
-        for param, lookup in filter_mapping.items():
-            value = self.request.query_params.get(param)
-            if value:
-                inscriptions = inscriptions.filter(**{lookup: value})
-        # Two autocomplete modes:
-        # 1) q provided => partial text search across supported fields.
-        # 2) no q => exact field matching for selected autocomplete item(s).
-        if q:
-            inscriptions = inscriptions.filter(_build_search_q(q))
-        else:
-            for param, lookup in search_mapping.items():
-                value = self.request.query_params.get(param)
-                if value:
-                    inscriptions = inscriptions.filter(**{lookup: value})
-        inscriptions = inscriptions.distinct()
+        # Filtering inscriptions (matching SearchDataWidgetViewSet exactly)
+        inscriptions = _filter_inscriptions(models.Inscription.objects.all(), self.request.query_params)
+        inscriptions = _search_inscriptions(inscriptions, self.request.query_params)
         # Generate summary with filtered inscriptions
         summary_data = self.summarize_results(inscriptions)
         
         return Response(summary_data)
     
     def summarize_results(self, queryset):
-        """Summarizes search results by creator and institution."""
-
-        summary = {
-            "type_of_inscription": [],
-            "writing_system": [],
-            "language": [],
-            "textual_genre": [],
-            "pictorial_description": [],
-            "min_year": [],
-            "max_year": [],
-            "avg_year": [],
-        }
-
-        # Count images per creator
-        type_of_inscription_counts = (
-            queryset
-            .values("type_of_inscription__text", "type_of_inscription__text_ukr")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-
-        # Count images per institution
-        writing_system_counts = (
-            queryset
-            .values("writing_system__text", "writing_system__text_ukr")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-        # Count of documentation types by site
-        language_counts = (
-            queryset
-            .values("language__text", "language__text_ukr")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-        # Summarise search results by motif type
-        textual_genre_counts = (
-            queryset
-            .values("genre__text", "genre__text_ukr")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-        # Show number of images for each year 
-        pictorial_description_counts = (
-            queryset
-            .values("tags__text", "tags__text_ukr")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-
-        min_year_counts = (
-            queryset
-            .values("min_year")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-        max_year_counts = (
-            queryset
-            .values("max_year")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("-count")
-        )
-
-        # Calculate average year and group by it
-        avg_year_counts = (
-            queryset
-            .filter(min_year__isnull=False, max_year__isnull=False, max_year__lte=F('min_year') + 200)  # Only include records with both years
-            .annotate(
-                avg_year=Cast((F('min_year') + F('max_year')) / 2, IntegerField())
-            )
-            .values("avg_year")
-            .annotate(count=Count("id", distinct=True))
-            .order_by("avg_year")
-        )   
-
-        # Format summary
-        summary["type_of_inscription"] = [
-            {
-                "type": entry["type_of_inscription__text"], 
-                "type_ukr": entry["type_of_inscription__text_ukr"], 
-                "count": entry["count"]}
-            for entry in type_of_inscription_counts if entry["type_of_inscription__text"]
-        ]   
-        summary["writing_system"] = [
-            {
-                "writing_system": entry["writing_system__text"], 
-                "writing_system_ukr": entry["writing_system__text_ukr"],
-                "count": entry["count"]}
-            for entry in writing_system_counts if entry["writing_system__text"]
-        ]   
-        summary["language"] = [
-            {
-                "language": entry["language__text"], 
-                "language_ukr": entry["language__text_ukr"],
-                "count": entry["count"]}
-            for entry in language_counts if entry["language__text"]
-        ]
-        summary["textual_genre"] = [
-            {
-                "textual_genre": entry["genre__text"], 
-                "textual_genre_ukr": entry["genre__text_ukr"],
-                "count": entry["count"]}
-            for entry in textual_genre_counts if entry["genre__text"]
-        ]
-        summary["pictorial_description"] = [
-            {
-                "pictorial_description": entry["tags__text"], 
-                "pictorial_description_ukr": entry["tags__text_ukr"],
-                "count": entry["count"]}
-            for entry in pictorial_description_counts if entry["tags__text"]
-        ]
-        summary["min_year"] = [
-            {"min_year": entry["min_year"], "count": entry["count"]}
-            for entry in min_year_counts if entry["min_year"]
-        ]
-        summary["max_year"] = [
-            {"max_year": entry["max_year"], "count": entry["count"]}
-            for entry in max_year_counts if entry["max_year"]
-        ]
-        summary["avg_year"] = [
-            {"avg_year": entry["avg_year"], "count": entry["count"]}
-            for entry in avg_year_counts if entry["avg_year"] is not None
-        ]       
-        return summary
\ No newline at end of file
+        """Summarizes search results by inscription metadata."""
+        return _summarize_inscriptions(queryset)